@@ -4,11 +4,30 @@ from typing import Tuple
 
 import numpy as np
 
-from config import ENTROPY_EPS
+from config import ENTROPY_EPS, ENTROPY_RESYNC_INTERVAL
+from grid import diamond_prefix_sums, diamond_sums
 
 Coord = Tuple[int, int]
 
 
+def _xlogx(values: np.ndarray) -> np.ndarray:
+    """Return values * log(values) with 0 log 0 taken as 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(values > 0.0, values * np.log(values), 0.0)
+
+
+def _binary_entropy(p):
+    """Return the entropy in nats of a Bernoulli(p) variable."""
+    return -(_xlogx(p) + _xlogx(1.0 - p))
+
+
+def _scaled_xlogx(likelihood: float, mass: float, mass_log: float) -> float:
+    """Return sum((l * p) log(l * p)) given sum(p) and sum(p log p) over a group of cells."""
+    if likelihood <= 0.0:
+        return 0.0
+    return likelihood * (mass_log + mass * float(np.log(likelihood)))
+
+
 class SensorModel:
     """Binary sensor model with false positive and false negative rates."""
 
@@ -26,69 +45,312 @@ class SensorModel:
 class BayesianBelief:
     """Belief grid over possible treasure locations."""
 
-    def __init__(self, grid, scan_radius: int, sensor_model: SensorModel):
+    # Probability grid behind the belief property; subclasses fill it in initialize_uniform_prior.
+    _belief: np.ndarray
+
+    def __init__(
+        self,
+        grid,
+        scan_radius: int,
+        sensor_model: SensorModel,
+        dtype=None,
+        log_space: bool = False,
+    ):
         self.grid = grid
         self.scan_radius = scan_radius
         self.sensor_model = sensor_model
-        self.belief = np.zeros((self.grid.grid_size, self.grid.grid_size), dtype=float)
+        # Log-space beliefs store unnormalized log weights and normalize only when read.
+        self.log_space = log_space
+        # Compact grids default to a float32 belief to halve its memory.
+        if dtype is None:
+            dtype = np.float32 if getattr(grid, "compact", False) else np.float64
+        self._belief = np.zeros((self.grid.grid_size, self.grid.grid_size), dtype=dtype)
+        # Unnormalized log weights; empty unless log_space is set.
+        self.log_belief = np.zeros_like(self._belief) if log_space else np.empty((0, 0), dtype=dtype)
+        self._stale = False
+        # Running entropy: sum(p log p), the log of the log-space normalizer and
+        # the number of scans applied since the last exact recomputation.
+        self._plogp_sum = 0.0
+        self._log_mass = 0.0
+        self._scans_since_exact = 0
         self.initialize_uniform_prior()
 
+    @property
+    def belief(self) -> np.ndarray:
+        """Return the normalized probability grid."""
+        if self._stale:
+            self.normalize()
+        return self._belief
+
+    @belief.setter
+    def belief(self, values: np.ndarray) -> None:
+        self._belief = values
+        if self.log_space:
+            with np.errstate(divide="ignore"):
+                self.log_belief = np.log(values)
+        self._stale = False
+        self._log_mass = 0.0
+        self._scans_since_exact = ENTROPY_RESYNC_INTERVAL
+
     def initialize_uniform_prior(self) -> None:
         """Initialize a uniform prior over all valid treasure cells."""
-        self.belief.fill(0.0)
-        valid_cells = self.grid.valid_cells()
+        self._belief.fill(0.0)
+        valid_mask = self.grid.valid_mask()
+        valid_count = self.grid.valid_count()
+
+        if self.log_space:
+            self.log_belief.fill(-np.inf)
+            self.log_belief[valid_mask] = 0.0
+        self._stale = False
+        self._scans_since_exact = 0
+        self._plogp_sum = 0.0
+        self._log_mass = 0.0
 
-        if not valid_cells:
+        if valid_count == 0:
             return
 
-        prior = 1.0 / len(valid_cells)
-        for row, col in valid_cells:
-            self.belief[row, col] = prior
+        self._plogp_sum = -float(np.log(valid_count))
+        self._log_mass = float(np.log(valid_count))
+
+        self._belief[valid_mask] = 1.0 / valid_count
 
     def simulate_observation(self, scan_center: Coord) -> bool:
         """Simulate a noisy sensor reading for a scan centered at the given cell."""
-        actual_present = any(
-            self.grid.is_treasure(cell)
-            for cell in self.grid.get_cells_in_radius(scan_center, self.scan_radius)
-        )
+        actual_present = self.grid.treasure_within(scan_center, self.scan_radius)
         present_probability = self.sensor_model.prob_observation(True, actual_present)
-        return bool(np.random.random() < present_probability)
+        return bool(self.grid.rng.random() < present_probability)
 
     def update(self, scan_center: Coord, observation: bool) -> None:
         """Apply a Bayesian update for the given observation at the scan center."""
-        scan_cells = set(self.grid.get_cells_in_radius(scan_center, self.scan_radius))
-        posterior = np.zeros_like(self.belief)
+        rows, cols, kernel = self.grid.get_radius_window(scan_center, self.scan_radius)
+        likelihood_in = self.sensor_model.prob_observation(observation, True)
+        likelihood_out = self.sensor_model.prob_observation(observation, False)
 
-        for row, col in self.grid.valid_cells():
-            actual_present = (row, col) in scan_cells
-            likelihood = self.sensor_model.prob_observation(observation, actual_present)
-            posterior[row, col] = likelihood * self.belief[row, col]
+        if self.log_space:
+            with np.errstate(divide="ignore"):
+                log_in = np.log(likelihood_in)
+                log_out = np.log(likelihood_out)
+            window = self.log_belief[rows, cols]
+            inside = window[kernel]
+            ratio = self._track_scan(np.exp(inside - self._log_mass), likelihood_in, likelihood_out)
+            if likelihood_out > 0.0:
+                # Scaling every weight by likelihood_out only moves the normalizer, so
+                # fold it into _log_mass and touch just the scan diamond.
+                window[kernel] = inside + (log_in - log_out)
+                if ratio > 0.0:
+                    self._log_mass += float(np.log(ratio)) - float(log_out)
+            else:
+                # Nothing outside the diamond can hold the treasure any more.
+                self.log_belief.fill(-np.inf)
+                window[kernel] = inside + log_in
+                if ratio > 0.0:
+                    self._log_mass += float(np.log(ratio))
+            self._stale = True
+            return
 
-        self.belief = posterior
+        # Every cell outside the scan diamond shares one likelihood, so scale the
+        # whole grid by it and then patch the (small) diamond with its own value.
+        window = self._belief[rows, cols]
+        self._track_scan(window[kernel], likelihood_in, likelihood_out)
+        inside = window[kernel] * likelihood_in
+        self._belief *= likelihood_out
+        self._belief *= self.grid.valid_mask()
+        window[kernel] = inside * self.grid.valid_mask()[rows, cols][kernel]
         self.normalize()
 
+    def _track_scan(self, inside: np.ndarray, likelihood_in: float, likelihood_out: float) -> float:
+        """Advance the running sum(p log p) past one scan and return the mass ratio.
+
+        inside holds the normalized probabilities in the scan diamond before the
+        update. Cells inside and outside are each scaled by one constant, so
+        only the diamond has to be summed.
+        """
+        mass_in = float(inside.sum())
+        mass_log_in = float(_xlogx(inside).sum())
+        ratio = likelihood_in * mass_in + likelihood_out * (1.0 - mass_in)
+        if ratio <= 0.0:
+            self._scans_since_exact = ENTROPY_RESYNC_INTERVAL
+            return ratio
+
+        scaled = (
+            _scaled_xlogx(likelihood_in, mass_in, mass_log_in)
+            + _scaled_xlogx(likelihood_out, 1.0 - mass_in, self._plogp_sum - mass_log_in)
+        )
+        self._plogp_sum = scaled / ratio - float(np.log(ratio))
+        self._scans_since_exact += 1
+        return ratio
+
     def normalize(self) -> None:
         """Normalize the belief grid so its total probability mass is one."""
-        total = float(self.belief.sum())
+        if self.log_space:
+            self._normalize_log()
+            return
+
+        total = float(self._belief.sum())
         if total <= 0.0:
             self.initialize_uniform_prior()
             return
 
-        self.belief /= total
+        self._belief /= total
+
+    def _normalize_log(self) -> None:
+        """Rebuild probabilities from the log weights, shifting them so the largest is zero."""
+        self._stale = False
+        peak = self.log_belief.max()
+        if not np.isfinite(peak):
+            self._belief.fill(0.0)
+            return
+
+        # Folding the shift back keeps the log weights bounded over long episodes.
+        self.log_belief -= peak
+        np.exp(self.log_belief, out=self._belief)
+        total = float(self._belief.sum())
+        self._belief /= total
+        self._log_mass = float(np.log(total))
 
     def compute_entropy(self) -> float:
-        """Compute Shannon entropy of the current belief distribution."""
-        probabilities = self.belief[self.belief > 0.0]
-        if probabilities.size == 0:
-            return 0.0
+        """Return the Shannon entropy of the current belief distribution.
+
+        The value is tracked in closed form across scans and recomputed exactly
+        every ENTROPY_RESYNC_INTERVAL scans to bound floating-point drift.
+        """
+        if self._scans_since_exact >= ENTROPY_RESYNC_INTERVAL:
+            probabilities = self.belief[self.belief > 0.0]
+            self._plogp_sum = float(np.sum(probabilities * np.log(probabilities + ENTROPY_EPS)))
+            self._scans_since_exact = 0
+
+        return -self._plogp_sum
+
+    def scan_presence_map(self) -> np.ndarray:
+        """Return, for each cell, the probability that a scan there covers a treasure.
 
-        return float(-np.sum(probabilities * np.log(probabilities + ENTROPY_EPS)))
+        The belief mass inside every scan diamond comes from one rotated
+        prefix-sum table, so the whole map costs O(N^2) for any radius.
+        """
+        size = self.grid.grid_size
+        rows, cols = np.indices((size, size))
+        table = diamond_prefix_sums(self.belief)
+        return np.clip(diamond_sums(table, rows, cols, self.scan_radius), 0.0, 1.0)
+
+    def information_gain_map(self) -> np.ndarray:
+        """Return the expected entropy reduction of scanning from each cell."""
+        mass = self.scan_presence_map()
+
+        false_positive = self.sensor_model.false_positive
+        false_negative = self.sensor_model.false_negative
+        present = mass * (1.0 - false_negative) + (1.0 - mass) * false_positive
+        return (
+            _binary_entropy(present)
+            - mass * _binary_entropy(false_negative)
+            - (1.0 - mass) * _binary_entropy(false_positive)
+        )
+
+    def condition_on_pickup(self, cell: Coord) -> None:
+        """Update the belief after the treasure at cell was collected."""
+        # A single-treasure belief has nothing left to say about the next one.
+        self.initialize_uniform_prior()
 
     def argmax_cell(self) -> Coord:
         """Return the cell with the highest belief value."""
-        row, col = np.unravel_index(np.argmax(self.belief), self.belief.shape)
+        weights = self.log_belief if self.log_space else self._belief
+        row, col = np.unravel_index(np.argmax(weights), weights.shape)
         return int(row), int(col)
 
     def get_belief(self) -> np.ndarray:
         """Return the current belief grid."""
-        return self.belief
\ No newline at end of file
+        return self.belief
+
+class MultiTreasureBelief(BayesianBelief):
+    """Per-cell occupancy probabilities for several treasures at once.
+
+    Cells are treated as independent Bernoulli variables (a mean-field
+    approximation), so the grid sums to the expected number of treasures
+    rather than to one. A scan only changes the cells in its diamond.
+    """
+
+    def __init__(
+        self,
+        grid,
+        scan_radius: int,
+        sensor_model: SensorModel,
+        treasure_count: int | None = None,
+        dtype=None,
+        log_space: bool = False,
+    ):
+        if log_space:
+            raise ValueError("MultiTreasureBelief does not support log-space beliefs")
+        # Known number of treasures still on the map; defaults to the grid's count.
+        self.treasure_count = len(grid.remaining_treasures()) if treasure_count is None else treasure_count
+        self._occupancy_entropy = 0.0
+        super().__init__(grid, scan_radius, sensor_model, dtype=dtype)
+
+    def initialize_uniform_prior(self) -> None:
+        """Spread the known treasure count evenly over all valid treasure cells."""
+        self._belief.fill(0.0)
+        valid_count = self.grid.valid_count()
+        if valid_count and self.treasure_count > 0:
+            self._belief[self.grid.valid_mask()] = min(self.treasure_count / valid_count, 1.0)
+        self._resync_entropy()
+
+    def update(self, scan_center: Coord, observation: bool) -> None:
+        """Condition every cell in the scan diamond on the observation."""
+        rows, cols, kernel = self.grid.get_radius_window(scan_center, self.scan_radius)
+        likelihood_in = self.sensor_model.prob_observation(observation, True)
+        likelihood_out = self.sensor_model.prob_observation(observation, False)
+
+        window = self._belief[rows, cols]
+        inside = window[kernel]
+        with np.errstate(divide="ignore"):
+            none_inside = float(np.exp(np.log1p(-inside).sum()))
+        evidence = likelihood_in * (1.0 - none_inside) + likelihood_out * none_inside
+        if evidence <= 0.0:
+            return
+
+        # P(cell occupied | obs): an occupied cell guarantees the diamond holds a treasure.
+        updated = np.minimum(inside * (likelihood_in / evidence), 1.0)
+        window[kernel] = updated
+        self._occupancy_entropy += float(np.sum(_binary_entropy(updated)) - np.sum(_binary_entropy(inside)))
+        self._scans_since_exact += 1
+
+    def normalize(self) -> None:
+        """Occupancy probabilities are not normalized; kept for interface compatibility."""
+
+    def condition_on_pickup(self, cell: Coord) -> None:
+        """Remove the collected treasure while keeping the evidence gathered about the others."""
+        self.treasure_count = max(self.treasure_count - 1, 0)
+        self._belief[cell[0], cell[1]] = 0.0
+        others = float(self._belief.sum())
+
+        if self.treasure_count == 0:
+            self._belief.fill(0.0)
+        elif others <= 0.0:
+            self.initialize_uniform_prior()
+            self._belief[cell[0], cell[1]] = 0.0
+        else:
+            # Rescale so the occupancies again add up to the known remaining count.
+            self._belief *= self.treasure_count / others
+            np.minimum(self._belief, 1.0, out=self._belief)
+        self._resync_entropy()
+
+    def expected_count(self) -> float:
+        """Return the expected number of treasures left on the map."""
+        return float(self._belief.sum())
+
+    def scan_presence_map(self) -> np.ndarray:
+        """Return, for each cell, the probability that a scan there covers at least one treasure."""
+        size = self.grid.grid_size
+        rows, cols = np.indices((size, size))
+        # Sum log(1 - p) over each diamond; clipping keeps certain cells finite in the table.
+        log_empty = np.log1p(-np.minimum(self._belief, 1.0 - ENTROPY_EPS))
+        table = diamond_prefix_sums(log_empty)
+        return np.clip(1.0 - np.exp(diamond_sums(table, rows, cols, self.scan_radius)), 0.0, 1.0)
+
+    def compute_entropy(self) -> float:
+        """Return the summed binary entropy of every cell's occupancy."""
+        if self._scans_since_exact >= ENTROPY_RESYNC_INTERVAL:
+            self._resync_entropy()
+        return self._occupancy_entropy
+
+    def _resync_entropy(self) -> None:
+        self._occupancy_entropy = float(np.sum(_binary_entropy(self._belief)))
+        self._scans_since_exact = 0
@@ -2,11 +2,31 @@ from __future__ import annotations
 from typing import Dict, List, Tuple
 import numpy as np
 
-from bayes import BayesianBelief, SensorModel
-from search import a_star
+from bayes import BayesianBelief, MultiTreasureBelief, SensorModel
+from dstar_lite import DStarLite
+from hpa import HierarchicalPlanner
+from search import a_star, distance_field, jps
 
 Coord = Tuple[int, int]
 
+# Point-to-point planners, run once per candidate target until one is reachable.
+PLANNERS = {
+    "a_star": a_star,
+    "jps": jps,
+}
+
+# Belief models: one treasure at a time, or per-cell occupancy for all remaining treasures.
+BELIEF_MODELS = {
+    "single": BayesianBelief,
+    "multi": MultiTreasureBelief,
+}
+
+# How choose_targets ranks cells: by belief alone, or by information gain and belief per step of travel.
+TARGET_MODES = ("belief", "info_gain")
+
+# Incremental planners kept alive between steps, one per recent target.
+MAX_INCREMENTAL_PLANNERS = 10
+
 
 class BayesianAgent:
     """Optimized Bayesian treasure hunting agent."""
@@ -17,10 +37,23 @@ class BayesianAgent:
         scan_radius: int,
         false_positive: float,
         false_negative: float,
+        planner: str = "a_star",
+        log_space: bool = False,
+        target_mode: str = "belief",
+        belief_model: str = "single",
     ):
+        if planner not in ("field", "dstar", "hpa") and planner not in PLANNERS:
+            raise ValueError(f"Unknown planner '{planner}'")
+        if target_mode not in TARGET_MODES:
+            raise ValueError(f"Unknown target mode '{target_mode}'")
+        if belief_model not in BELIEF_MODELS:
+            raise ValueError(f"Unknown belief model '{belief_model}'")
+
         self.grid = grid
+        self.planner = planner
+        self.target_mode = target_mode
         self.sensor_model = SensorModel(false_positive, false_negative)
-        self.belief = BayesianBelief(grid, scan_radius, self.sensor_model)
+        self.belief = BELIEF_MODELS[belief_model](grid, scan_radius, self.sensor_model, log_space=log_space)
         self.belief.initialize_uniform_prior()
 
         self.moves = 0
@@ -29,6 +62,10 @@ class BayesianAgent:
         self.entropy_history: List[float] = []
 
         self.unreachable = set()
+        # Cells the agent has moved away from since its last pickup.
+        self.visited: set[Coord] = set()
+        self.incremental_planners: Dict[Coord, DStarLite] = {}
+        self.hierarchical_planner: HierarchicalPlanner | None = None
 
     # SCAN
     def scan(self) -> bool:
@@ -44,63 +81,109 @@ class BayesianAgent:
     # TARGET SELECTION
     def choose_targets(self, k: int = 10) -> List[Coord]:
         """
-        Return top-k highest probability cells.
-        Avoid unreachable cells.
+        Return top-k highest scoring cells.
+        Avoid unreachable cells, and in info_gain mode cells visited since the last pickup.
         """
 
         belief = self.belief.belief
-
-        flat = belief.flatten()
-        indices = flat.argsort()[::-1]
-
-        targets = []
         size = self.grid.grid_size
 
-        for idx in indices:
-            r = idx // size
-            c = idx % size
-            cell = (r, c)
+        # Only cells in the agent's connected component can ever be reached.
+        candidates = self.grid.reachability().component_mask(self.grid.agent_coords)
+        for row, col in self.unreachable:
+            candidates[row, col] = False
+        if self.target_mode == "info_gain":
+            # Standing on a cell without a pickup rules it out until the next treasure is found.
+            candidates[self.grid.agent_coords] = False
+            for row, col in self.visited:
+                candidates[row, col] = False
 
-            if cell in self.unreachable:
-                continue
+        if self.target_mode == "info_gain":
+            # Trade what a scan there would teach us (plus the chance of a pickup) against travel.
+            distances = distance_field(self.grid, self.grid.agent_coords).distances
+            score = (self.belief.information_gain_map() + belief) / (1 + np.maximum(distances, 0))
+        else:
+            score = belief
 
-            if self.grid.is_blocked(cell):
-                continue
-
-            targets.append(cell)
-            if len(targets) >= k:
-                break
+        indices = np.flatnonzero(candidates)
+        order = indices[np.argsort(score.ravel()[indices], kind="stable")[::-1]]
 
-        return targets
+        return [(int(idx // size), int(idx % size)) for idx in order[:k]]
 
     # MOVE
     def move_to_target(self) -> bool:
         """Move toward best reachable belief target."""
-        targets = self.choose_targets()
-        start = self.grid.agent_coords
-
-        for target in targets:
-            result = a_star(self.grid.get_grid(), start, target)
-
-            if len(result.path) >= 2:
-                next_cell = result.path[1]
-                old_row, old_col = start
-                new_row, new_col = next_cell
+        next_cell = self.plan_next_cell(self.choose_targets())
 
-                if self.grid.get_grid()[old_row, old_col] == 4:
-                    self.grid.get_grid()[old_row, old_col] = 0
+        if next_cell is None:
+            return False
 
-                self.grid.agent_coords = next_cell
-                if not self.grid.is_treasure(next_cell):
-                    self.grid.get_grid()[new_row, new_col] = 4
+        self.visited.add(self.grid.agent_coords)
+        self.grid.move_agent(next_cell)
+        self.moves += 1
+        return True
 
-                self.moves += 1
-                return True
+    def plan_next_cell(self, targets: List[Coord]) -> Coord | None:
+        """Return the first move toward the first reachable target, marking the rest unreachable."""
+        start = self.grid.agent_coords
 
-            # mark unreachable
+        if self.planner == "field":
+            # One BFS from the agent answers reachability and the next move for every target.
+            field = distance_field(self.grid, start)
+
+            for target in targets:
+                if field.distance(target) >= 1:
+                    return field.next_cell(target)
+                self.unreachable.add(target)
+            return None
+
+        if self.planner == "dstar":
+            for target in targets:
+                next_cell = self._incremental_next_cell(start, target)
+                if next_cell is not None:
+                    return next_cell
+                self.unreachable.add(target)
+            return None
+
+        if self.planner == "hpa":
+            if self.hierarchical_planner is None:
+                self.hierarchical_planner = HierarchicalPlanner(self.grid)
+            else:
+                self.hierarchical_planner.sync(self.grid)
+
+            for target in targets:
+                next_cell = self.hierarchical_planner.next_cell(start, target)
+                if next_cell is not None:
+                    return next_cell
+                self.unreachable.add(target)
+            return None
+
+        search = PLANNERS[self.planner]
+        for target in targets:
+            # Passing the Grid lets the search reuse its cached blocked-cell bytes.
+            result = search(self.grid, start, target)
+            if len(result.path) >= 2:
+                return result.path[1]
             self.unreachable.add(target)
-
-        return False
+        return None
+
+    def _incremental_next_cell(self, start: Coord, target: Coord) -> Coord | None:
+        """Replan toward target, reusing the D* Lite search tree kept for it, and return the first move."""
+        planner = self.incremental_planners.pop(target, None)
+        if planner is None:
+            planner = DStarLite(self.grid, start, target)
+
+        # Reinsert so the dict stays ordered from least to most recently used.
+        self.incremental_planners[target] = planner
+        if len(self.incremental_planners) > MAX_INCREMENTAL_PLANNERS:
+            oldest = next(iter(self.incremental_planners))
+            del self.incremental_planners[oldest]
+
+        # Only the first move is needed, so skip walking the whole path as plan() would.
+        planner.update_start(start)
+        planner.sync(self.grid)
+        planner.compute_shortest_path()
+        return planner.next_cell()
 
     # STEP
     def step(self) -> Dict[str, object]:
@@ -113,9 +196,9 @@ class BayesianAgent:
         if self.grid.is_treasure(agent_pos):
             self.grid.remove_treasure(agent_pos)
             self.treasures_found += 1
-            # reset belief after collecting treasure
-            self.belief.initialize_uniform_prior()
+            self.belief.condition_on_pickup(agent_pos)
             self.unreachable.clear()
+            self.visited.clear()
             found_treasure = True
 
         return {
@@ -3,6 +3,7 @@ DEFAULT_GRID_SIZE = 20
 MIN_GRID_SIZE = 8
 CELL_SIZE = 35
 ENTROPY_EPS = 1e-12
+ENTROPY_RESYNC_INTERVAL = 64   # scans between exact entropy recomputations
 DEFAULT_SCAN_RADIUS = 15
 DEFAULT_FALSE_POSITIVE = 0.1
 DEFAULT_FALSE_NEGATIVE = 0.2
@@ -19,6 +20,7 @@ COLORS = {
     'trap': '#f7b9fa',   # trap - blue
     'wall': '#fcba03',   # wall - orange
     'start': '#88e788',  # start - green
+    'explored': '#9e9e9e',  # traced search expansion - dark gray
 }
 
 SYMBOLS = {
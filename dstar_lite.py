@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import heapq
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from search import SearchResult, _cell_array, _ChangeCursor, _neighbor_view, build_blocked_flags
+
+Coord = Tuple[int, int]
+
+INF = float("inf")
+
+
+class DStarLite:
+    """Incremental shortest-path planner (D* Lite) toward a fixed goal.
+
+    The search runs backward from the goal, so g-values are distances to the
+    goal and stay valid while the agent walks. Moving the start only shifts the
+    priority offset ``km``; changed cells are picked up by ``sync`` and only
+    the affected part of the search tree is repaired. Built from a Grid,
+    ``sync`` reads the grid's list of changed cells instead of diffing it.
+    """
+
+    def __init__(self, grid, start: Coord, goal: Coord):
+        if hasattr(grid, "blocked_flags"):
+            self.size = grid.grid_size
+            # Our own copy of the blocked bytes, including the always-blocked off-grid sentinel.
+            self.blocked = bytearray(grid.blocked_flags())
+        else:
+            cells = _cell_array(grid)
+            self.size = len(cells)
+            self.blocked = build_blocked_flags(cells)
+        self._changes = _ChangeCursor(grid)
+        self.goal = (int(goal[0]), int(goal[1]))
+        self.start = (int(start[0]), int(start[1]))
+        self.neighbors = _neighbor_view(self.size)
+
+        # One extra slot so the sentinel neighbour can be looked up like any other cell.
+        cell_count = self.size * self.size + 1
+        self.g = [INF] * cell_count
+        self.rhs = [INF] * cell_count
+        self.km = 0
+        self.nodes_expanded = 0
+
+        # Lazy-deletion heap: entries whose key no longer matches open_key are stale.
+        self.heap: List[Tuple[Tuple[float, float], int]] = []
+        self.open_key: List[Tuple[float, float] | None] = [None] * cell_count
+
+        goal_index = self._index(self.goal)
+        if not self.blocked[goal_index]:
+            self.rhs[goal_index] = 0
+            self._push(goal_index)
+
+    def _index(self, cell: Coord) -> int:
+        return cell[0] * self.size + cell[1]
+
+    def _neighbors(self, index: int) -> memoryview:
+        return self.neighbors[4 * index:4 * index + 4]
+
+    def _heuristic(self, index: int) -> int:
+        row, col = divmod(index, self.size)
+        return abs(row - self.start[0]) + abs(col - self.start[1])
+
+    def _key(self, index: int) -> Tuple[float, float]:
+        best = min(self.g[index], self.rhs[index])
+        return best + self._heuristic(index) + self.km, best
+
+    def _push(self, index: int) -> None:
+        key = self._key(index)
+        self.open_key[index] = key
+        heapq.heappush(self.heap, (key, index))
+
+    def _update_vertex(self, index: int) -> None:
+        if index != self._index(self.goal):
+            best = INF
+            if not self.blocked[index]:
+                g = self.g
+                blocked = self.blocked
+                for nb in self._neighbors(index):
+                    if not blocked[nb] and g[nb] + 1 < best:
+                        best = g[nb] + 1
+            self.rhs[index] = best
+
+        if self.g[index] != self.rhs[index]:
+            self._push(index)
+        else:
+            self.open_key[index] = None
+
+    def update_start(self, start: Coord) -> None:
+        """Move the start; keys already queued stay valid through ``km``."""
+        start = (int(start[0]), int(start[1]))
+        if start == self.start:
+            return
+        self.km += abs(start[0] - self.start[0]) + abs(start[1] - self.start[1])
+        self.start = start
+
+    def sync(self, grid) -> int:
+        """Repair the search for cells whose blocked state changed; return how many did."""
+        flips = self._changes.flips(grid, lambda cell: bool(self.blocked[self._index(cell)]))
+
+        if flips is None:
+            blocked = np.frombuffer(build_blocked_flags(_cell_array(grid)), dtype=np.uint8)
+            changed = np.flatnonzero(blocked != np.frombuffer(self.blocked, dtype=np.uint8)).tolist()
+            for index in changed:
+                self.blocked[index] = blocked[index]
+        else:
+            changed = []
+            for cell, state in flips:
+                index = self._index(cell)
+                self.blocked[index] = state
+                changed.append(index)
+
+        for index in changed:
+            self._update_vertex(index)
+            for nb in self._neighbors(index):
+                self._update_vertex(nb)
+        return len(changed)
+
+    def compute_shortest_path(self) -> None:
+        """Expand inconsistent cells until the start's distance is settled."""
+        start = self._index(self.start)
+        heap = self.heap
+        open_key = self.open_key
+        g = self.g
+        rhs = self.rhs
+
+        while heap and (heap[0][0] < self._key(start) or rhs[start] != g[start]):
+            old_key, index = heapq.heappop(heap)
+            if open_key[index] != old_key:
+                continue
+
+            new_key = self._key(index)
+            if old_key < new_key:
+                self._push(index)
+                continue
+
+            open_key[index] = None
+            self.nodes_expanded += 1
+
+            if g[index] > rhs[index]:
+                g[index] = rhs[index]
+            else:
+                g[index] = INF
+                self._update_vertex(index)
+            for nb in self._neighbors(index):
+                self._update_vertex(nb)
+
+    def next_cell(self) -> Coord | None:
+        """Return the neighbour of the start on a shortest path, or None if unreachable."""
+        start = self._index(self.start)
+        if self.g[start] == INF or start == self._index(self.goal):
+            return None
+
+        best_index = -1
+        best = INF
+        for nb in self._neighbors(start):
+            if not self.blocked[nb] and self.g[nb] + 1 < best:
+                best = self.g[nb] + 1
+                best_index = nb
+        if best_index < 0:
+            return None
+        return divmod(best_index, self.size)
+
+    def path(self) -> List[Coord]:
+        """Follow decreasing g-values from the start to the goal."""
+        start = self._index(self.start)
+        if self.g[start] == INF:
+            return []
+
+        path = [self.start]
+        current = self.start
+        for _ in range(int(self.g[start])):
+            index = self._index(current)
+            current = min(
+                (nb for nb in self._neighbors(index) if not self.blocked[nb]),
+                key=lambda nb: self.g[nb],
+            )
+            current = divmod(current, self.size)
+            path.append(current)
+        return path
+
+    def plan(self, grid, start: Coord) -> SearchResult:
+        """Replan after the agent moved to start and the grid possibly changed."""
+        t0 = time.perf_counter()
+        expanded_before = self.nodes_expanded
+
+        self.update_start(start)
+        self.sync(grid)
+        self.compute_shortest_path()
+        path = self.path()
+
+        t1 = time.perf_counter()
+        return SearchResult(
+            path=path,
+            nodes_expanded=self.nodes_expanded - expanded_before,
+            runtime=t1 - t0,
+        )
@@ -8,6 +8,8 @@ import numpy as np
 from bayesian_agent import BayesianAgent
 from config import NOISE_PRESETS
 from grid import Grid
+from scenario import load_pool, pool_seeds
+from search import a_star, distance_field, jps
 
 ResultValue = float | int | bool | str
 
@@ -22,8 +24,15 @@ class ExperimentRunner:
         false_positive: float,
         false_negative: float,
         seeds: Iterable[int],
+        compact: bool = False,
+        use_pool: bool = False,
     ):
         self.grid_size = grid_size
+        self.compact = compact
+        # Check maps out of a cached scenario pool instead of regenerating them per episode.
+        self.use_pool = use_pool
+        self.pool: np.ndarray | None = None
+        self.pool_rows: Dict[int, int] = {}
         self.scan_radius = scan_radius
         self.false_positive = false_positive
         self.false_negative = false_negative
@@ -35,8 +44,11 @@ class ExperimentRunner:
 
     def run_episode(self, seed: int) -> Dict[str, ResultValue]:
         """Run one episode and return collected metrics."""
-        grid = Grid(self.grid_size)
-        grid.reset_random(seed)
+        if self.use_pool:
+            grid = Grid.from_codes(self.pool_map(seed), seed=seed, compact=self.compact)
+        else:
+            grid = Grid(self.grid_size, compact=self.compact)
+            grid.reset_random(seed)
 
         agent = BayesianAgent(
             grid=grid,
@@ -65,6 +77,13 @@ class ExperimentRunner:
             "steps": steps,
         }
 
+    def pool_map(self, seed: int) -> np.ndarray:
+        """Return the pooled cell codes for a seed, loading the pool on first use."""
+        if self.pool is None:
+            self.pool = load_pool(self.grid_size, self.seeds)
+            self.pool_rows = {pool_seed: row for row, pool_seed in enumerate(pool_seeds(self.seeds))}
+        return self.pool[self.pool_rows[seed]]
+
     def run_experiments(self) -> Dict[str, float]:
         """Run all configured episodes and return aggregated statistics."""
         self.episode_results = [self.run_episode(seed) for seed in self.seeds]
@@ -129,6 +148,8 @@ class ExperimentRunner:
                 false_positive=false_positive,
                 false_negative=false_negative,
                 seeds=self.seeds,
+                compact=self.compact,
+                use_pool=self.use_pool,
             )
             aggregated = runner.run_experiments()
             self.noise_results[noise_level] = aggregated
@@ -190,3 +211,72 @@ class ExperimentRunner:
                     f"{stats['success_rate']:.3f}",
                 )
             )
+
+
+def benchmark_planners(
+    sizes: Iterable[int] = (20, 50, 100, 200, 500, 1000),
+    wall_density: float = 0.2,
+    trials: int = 3,
+    seed: int = 0,
+) -> List[Dict[str, ResultValue]]:
+    """Compare a_star and jps on random walled grids from corner to corner.
+
+    Each trial draws walls with the given density and redraws until the far
+    corner is reachable, then runs both planners on the same grid.
+    """
+    rng = np.random.default_rng(seed)
+    planners = {"a_star": a_star, "jps": jps}
+    rows: List[Dict[str, ResultValue]] = []
+
+    for size in sizes:
+        start = (0, 0)
+        goal = (size - 1, size - 1)
+        totals = {name: {"nodes": 0.0, "runtime": 0.0, "length": 0.0} for name in planners}
+
+        for _ in range(trials):
+            while True:
+                grid = np.where(rng.random((size, size)) < wall_density, 3, 0)
+                grid[start] = 4
+                grid[goal] = 1
+                if distance_field(grid, start).reachable(goal):
+                    break
+
+            for name, planner in planners.items():
+                if not totals[name]["nodes"]:
+                    # Warm-up run so per-size table caches are not billed to one planner.
+                    planner(grid, start, goal)
+                result = planner(grid, start, goal)
+                totals[name]["nodes"] += result.nodes_expanded
+                totals[name]["runtime"] += result.runtime
+                totals[name]["length"] += max(len(result.path) - 1, 0)
+
+        for name, stats in totals.items():
+            rows.append({
+                "size": size,
+                "planner": name,
+                "avg_nodes_expanded": stats["nodes"] / trials,
+                "avg_runtime": stats["runtime"] / trials,
+                "avg_path_length": stats["length"] / trials,
+            })
+
+    return rows
+
+
+def print_planner_comparison(rows: List[Dict[str, ResultValue]]) -> None:
+    """Print benchmark_planners output as a table."""
+    headers = ["Size", "Planner", "Avg Nodes", "Avg Time (ms)", "Avg Length"]
+    row_format = "{:<8}{:<10}{:<14}{:<16}{:<12}"
+
+    print(row_format.format(*headers))
+    print("-" * 60)
+
+    for row in rows:
+        print(
+            row_format.format(
+                str(row["size"]),
+                str(row["planner"]),
+                f"{float(row['avg_nodes_expanded']):.1f}",
+                f"{float(row['avg_runtime']) * 1000:.2f}",
+                f"{float(row['avg_path_length']):.1f}",
+            )
+        )
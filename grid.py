@@ -1,90 +1,229 @@
+from __future__ import annotations
+import copy
+from functools import lru_cache
 import numpy as np
 from config import MIN_GRID_SIZE
 import config
-from search import dfs
+from reachability import ReachabilityIndex
+from scenario import LAYOUTS, load_scenarios
+from search import build_blocked_flags, build_jump_tables, count_dtype, distance_field
 from typing import Tuple
 
 Coord = Tuple[int, int]
 
+
+@lru_cache(maxsize=16)
+def diamond_kernel(radius: int) -> np.ndarray:
+    """Return a read-only (2r+1, 2r+1) mask of offsets within Manhattan radius r."""
+    offsets = np.abs(np.arange(-radius, radius + 1))
+    kernel = offsets[:, None] + offsets[None, :] <= radius
+    kernel.setflags(write=False)
+    return kernel
+
+
+def diamond_prefix_sums(values: np.ndarray, dtype=None) -> np.ndarray:
+    """Return a summed-area table of a square grid rotated 45 degrees.
+
+    Cell (r, c) moves to (r + c, r - c + N - 1), which turns every Manhattan
+    diamond into an axis-aligned square that diamond_sums reads in O(1).
+    ``dtype`` defaults to float64 or int64; a narrower one must hold the total.
+    """
+    size = values.shape[0]
+    rows, cols = np.indices((size, size))
+    if dtype is None:
+        dtype = np.float64 if values.dtype.kind == "f" else np.int64
+    rotated = np.zeros((2 * size - 1, 2 * size - 1), dtype=dtype)
+    rotated[rows + cols, rows - cols + size - 1] = values
+    table = np.zeros((2 * size, 2 * size), dtype=dtype)
+    np.cumsum(rotated, axis=0, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+
+def diamond_sums(table: np.ndarray, rows, cols, radius: int):
+    """Sum values within Manhattan radius of each (row, col) from a diamond_prefix_sums table."""
+    span = table.shape[0] - 1
+    size = (span + 1) // 2
+    u = np.asarray(rows) + np.asarray(cols)
+    v = np.asarray(rows) - np.asarray(cols) + size - 1
+    u_start = np.clip(u - radius, 0, span)
+    u_stop = np.clip(u + radius + 1, 0, span)
+    v_start = np.clip(v - radius, 0, span)
+    v_stop = np.clip(v + radius + 1, 0, span)
+    return table[u_stop, v_stop] - table[u_start, v_stop] - table[u_stop, v_start] + table[u_start, v_start]
+
+
+class BitLayer:
+    """Boolean grid layer packed eight cells per byte along each row."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.bits = np.zeros((size, (size + 7) // 8), dtype=np.uint8)
+
+    def __getitem__(self, key):
+        row, col = key
+        if isinstance(col, slice):
+            col_start, col_stop, _ = col.indices(self.size)
+            byte_start = col_start >> 3
+            # Unpack only the bytes covering the requested columns.
+            chunk = np.unpackbits(self.bits[row, byte_start:(col_stop + 7) >> 3], axis=-1)
+            return chunk[..., col_start - 8 * byte_start:col_stop - 8 * byte_start].view(bool)
+        return bool(self.bits[row, col >> 3] & (0x80 >> (col & 7)))
+
+    def __setitem__(self, key, value) -> None:
+        row, col = key
+        if value:
+            self.bits[row, col >> 3] |= 0x80 >> (col & 7)
+        else:
+            self.bits[row, col >> 3] &= ~np.uint8(0x80 >> (col & 7))
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> BitLayer:
+        """Pack a square boolean mask into a new layer in one call."""
+        layer = cls(len(mask))
+        layer.bits = np.packbits(mask, axis=1)
+        return layer
+
+    def __or__(self, other: BitLayer) -> BitLayer:
+        layer = BitLayer(self.size)
+        np.bitwise_or(self.bits, other.bits, out=layer.bits)
+        return layer
+
+    def copy(self) -> BitLayer:
+        layer = BitLayer(self.size)
+        layer.bits[:] = self.bits
+        return layer
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        cells = np.unpackbits(self.bits, axis=1, count=self.size).view(bool)
+        return cells if dtype is None else cells.astype(dtype)
+
+
 class Grid:
-    def __init__(self, grid_size):
+    def __init__(
+        self,
+        grid_size,
+        seed: int | None = None,
+        compact: bool = False,
+        layout: str = "prompt2",
+        codes: np.ndarray | None = None,
+    ):
         self.grid_size = grid_size
+        # Compact grids keep uint8 cell codes and bit-packed layers for memory-bound batch runs.
+        self.compact = compact
+        self.cell_dtype = np.uint8 if compact else int
+        # Per-grid random source for layout generation and sensor noise.
+        self.rng = np.random.default_rng(seed)
 
         if self.grid_size < MIN_GRID_SIZE:
             raise ValueError(f"Grid size must be at least {MIN_GRID_SIZE}")
 
         config.GRID_SIZE = self.grid_size
 
-        # self.agent_coords = (10,10)
-        # self.treasure_coords = [(3, 17), (17, 3)]
-        # self.traps_coords = [(3, 16),(4, 17), (16, 3), (17, 4)]
-        # self.walls_coords = [(1,8), (2,8), (3,9), (4,9), (5,15), 
-        #                     (6,12), (7,7), (8,13), (10,6), (11,10), 
-        #                     (13,3), (14,14), (15,6), (17,18), 
-        #                     (18,9), (5,4), (9,4), (12,16)]
-
-
-        # ======================================================
-        # PROMPT 1: Medium Noise Treasure Hunt
-        # ======================================================
-        # self.agent_coords = (2, 2)
+        # Per-treasure BFS distance maps, rebuilt lazily after layout changes.
+        self._treasure_distances: dict[Coord, np.ndarray] = {}
+        self._nearest_treasure: np.ndarray | None = None
+        self._reachability: ReachabilityIndex | None = None
+        # Cells that could hold treasure, rebuilt only when walls or traps change.
+        self._valid_mask: np.ndarray | None = None
+        self._valid_indices: np.ndarray | None = None
+        self._valid_count: int | None = None
+        self._valid_cells: list[Coord] | None = None
+        # Rotated prefix sums of the treasure layer for O(1) "treasure within radius" checks.
+        self._treasure_sums: np.ndarray | None = None
+        # Flat blocked-cell bytes shared by every search on this grid, patched by set_cell.
+        self._blocked_flags: bytearray | None = None
+        # Per-direction jps scan lengths, rebuilt lazily after walls or traps change.
+        self._jump_tables: np.ndarray | None = None
+        # Cells whose blocked state set_cell flipped since the layout was last rebuilt, so
+        # incremental planners can catch up without diffing the grid. Change number
+        # _blocked_log_start + i is _blocked_log[i].
+        self._blocked_log: list[Coord] = []
+        self._blocked_log_start = 0
 
-        # self.treasure_coords = [
-        #     (6, 8)
-        # ]
-
-        # self.traps_coords = [
-        #     (5, 7),
-        #     (14, 13)
-        # ]
-
-        # self.walls_coords = [
-        #     (4,5),(4,6),(4,7),
-        #     (9,10),(10,10),(11,10),
-        #     (12,4),(13,4),(14,4),
-        #     (16,11)
-        # ]
+        self.random_walls = self.calculate_num_walls()   # for when you want to generate the walls randomly
+        self.random_traps = self.calculate_num_traps()   # for when you want to generate the traps randomly
 
+        if codes is not None:
+            self.load_codes(codes)
+            return
 
-        # ======================================================
-        # PROMPT 2: High Noise Treasure Hunt
-        # ======================================================
+        cells = LAYOUTS[layout]
+        self.agent_coords = cells["agent"]
+        self.treasure_coords = list(cells["treasures"])
+        self.traps_coords = list(cells["traps"])
+        self.walls_coords = list(cells["walls"])
 
-        self.agent_coords = (18, 3)
-        
-        self.treasure_coords = [
-            (5,16),
-            (11,11),
-            (17,14)
-        ]
-        
-        self.traps_coords = [
-            (6,15),
-            (10,12),
-            (16,13)
-        ]
-        
-        self.walls_coords = [
-            (3,8),(4,8),(5,8),
-            (8,4),(8,5),(8,6),
-            (10,15),(11,15),(12,15),
-            (13,9),(14,9),(15,9)
-        ]
-        
-        self.random_walls = self.calculate_num_walls()   # for when you want to generate the walls randomly
-        self.random_traps = self.calculate_num_traps()   # for when you want to generate the traps randomly
-        
         self.generate_grid()
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, seed: int | None = None, compact: bool = False) -> Grid:
+        """Build a grid from a square array of cell codes (0-3, with 4 marking the agent)."""
+        return cls(len(codes), seed=seed, compact=compact, codes=codes)
+
+    @classmethod
+    def from_scenario(cls, path: str, index: int = 0, seed: int | None = None, compact: bool = False) -> Grid:
+        """Build a grid from map index of a scenario file, reading only that map."""
+        return cls.from_codes(load_scenarios(path)[index], seed=seed, compact=compact)
+
+    def load_codes(self, codes: np.ndarray) -> None:
+        """Replace the layout with the given cell codes."""
+        codes = np.asarray(codes)
+        if codes.shape != (self.grid_size, self.grid_size):
+            raise ValueError(f"Expected a {self.grid_size} x {self.grid_size} map, got {codes.shape}")
+
+        agents = np.argwhere(codes == 4)
+        if len(agents) != 1:
+            raise ValueError(f"Expected exactly one agent cell, found {len(agents)}")
+
+        self.agent_coords = (int(agents[0][0]), int(agents[0][1]))
+        # The layers come straight from the codes; coordinate lists are built on first use.
+        self._treasure_coords = self._traps_coords = self._walls_coords = None
+        self.grid = codes.astype(self.cell_dtype)
+        self._layout_changed()
         
+    @property
+    def treasure_coords(self) -> list[Coord]:
+        """Treasure cells, listed from the treasure layer on first use."""
+        if self._treasure_coords is None:
+            self._treasure_coords = self._layer_coords(self._treasures)
+        return self._treasure_coords
+
+    @treasure_coords.setter
+    def treasure_coords(self, coords: list[Coord]) -> None:
+        self._treasure_coords = coords
+
+    @property
+    def traps_coords(self) -> list[Coord]:
+        """Trap cells, listed from the trap layer on first use."""
+        if self._traps_coords is None:
+            self._traps_coords = self._layer_coords(self._traps)
+        return self._traps_coords
+
+    @traps_coords.setter
+    def traps_coords(self, coords: list[Coord]) -> None:
+        self._traps_coords = coords
+
+    @property
+    def walls_coords(self) -> list[Coord]:
+        """Wall cells, listed from the wall layer on first use."""
+        if self._walls_coords is None:
+            self._walls_coords = self._layer_coords(self._walls)
+        return self._walls_coords
+
+    @walls_coords.setter
+    def walls_coords(self, coords: list[Coord]) -> None:
+        self._walls_coords = coords
+
     def calculate_num_walls(self):
-        return int(np.random.randint(5, 10))
+        return int(self.rng.integers(5, 10))
 
     def calculate_num_traps(self):
         return int(2)
     
     def generate_grid(self):
         for _ in range(100):
-            self.grid = np.zeros((self.grid_size, self.grid_size), dtype=int)
+            self.grid = np.zeros((self.grid_size, self.grid_size), dtype=self.cell_dtype)
 
             startx, starty = self.agent_coords
             self.grid[startx, starty] = 4
@@ -99,6 +238,7 @@ class Grid:
                 self.grid[wall_x, wall_y] = 3
 
             start = (startx, starty)
+            self._layout_changed()
 
             if self._solution_exists(start):
                 return
@@ -107,33 +247,23 @@ class Grid:
 
     # Generate a random grid with random walls, traps, and treasures
     def generate_random_grid(self):
+        num_treasures = 2
         for _ in range(100):
-            self.grid = np.zeros((self.grid_size, self.grid_size), dtype=int)
-            treasure_coords = []
-            traps_coords = []
-            walls_coords = []
+            self.grid = np.zeros((self.grid_size, self.grid_size), dtype=self.cell_dtype)
 
             startx, starty = self.agent_coords
             self.grid[startx, starty] = 4
 
-            for _ in range(2):
-                treasure_x, treasure_y = self.get_random_empty_cell()
-                self.grid[treasure_x, treasure_y] = 1
-                treasure_coords.append((treasure_x, treasure_y))
-
-            for _ in range(self.random_traps):
-                trap_x, trap_y = self.get_random_empty_cell()
-                self.grid[trap_x, trap_y] = 2
-                traps_coords.append((trap_x, trap_y))
-
-            for _ in range(self.random_walls):
-                wall_x, wall_y = self.get_random_empty_cell()
-                self.grid[wall_x, wall_y] = 3
-                walls_coords.append((wall_x, wall_y))
+            # Draw every treasure, trap and wall cell at once, without replacement.
+            cells = self.get_random_empty_cells(num_treasures + self.random_traps + self.random_walls)
+            values = np.repeat([1, 2, 3], [num_treasures, self.random_traps, self.random_walls])
+            self.grid[cells[:, 0], cells[:, 1]] = values
 
-            self.treasure_coords = treasure_coords
-            self.traps_coords = traps_coords
-            self.walls_coords = walls_coords
+            coords = [tuple(cell) for cell in cells.tolist()]
+            self.treasure_coords = coords[:num_treasures]
+            self.traps_coords = coords[num_treasures:num_treasures + self.random_traps]
+            self.walls_coords = coords[num_treasures + self.random_traps:]
+            self._layout_changed()
             
             start = (startx, starty)
 
@@ -142,43 +272,142 @@ class Grid:
 
         raise RuntimeError("Failed to generate a valid grid after 100 attempts")
 
-    
     def get_random_empty_cell(self):
-        row = np.random.randint(0, self.grid_size)
-        col = np.random.randint(0, self.grid_size)
-
-        if self.grid[row, col] != 0:
-            return self.get_random_empty_cell()
-        
-        return row, col
+        row, col = self.get_random_empty_cells(1)[0]
+        return int(row), int(col)
+
+    def get_random_empty_cells(self, count: int) -> np.ndarray:
+        """Return a (count, 2) array of distinct empty cells drawn uniformly."""
+        empty = np.flatnonzero(self.grid.ravel() == 0)
+        if count > empty.size:
+            raise RuntimeError(f"Cannot place {count} items on {empty.size} empty cells")
+
+        chosen = self.rng.choice(empty, size=count, replace=False)
+        rows, cols = np.divmod(chosen, self.grid_size)
+        return np.stack((rows, cols), axis=1)
     
     def get_grid(self):
+        """Return the cell codes (read-only; change cells through set_cell and move_agent)."""
         return self.grid
 
+    def fork(self) -> Grid:
+        """Return a copy-on-write snapshot of this grid for rollouts and what-if runs.
+
+        Forking is O(1): both grids share every array until one of them first
+        writes, and then only the written part (agent/treasure state or the
+        wall/trap layout) is copied. The fork gets an independent copy of the RNG.
+        """
+        child = copy.copy(self)
+        child.rng = copy.deepcopy(self.rng)
+        self._owns_state = self._owns_layout = False
+        child._owns_state = child._owns_layout = False
+        return child
+
+    def move_agent(self, cell: Coord) -> None:
+        """Move the agent marker to the given cell."""
+        self._own_state()
+        old_row, old_col = self.agent_coords
+        if self.grid[old_row, old_col] == 4:
+            self.grid[old_row, old_col] = 0
+
+        self.agent_coords = cell
+        if not self.is_treasure(cell):
+            self.grid[cell[0], cell[1]] = 4
+
     def is_wall(self, cell: Coord) -> bool:
         """Return True when the given cell contains a wall."""
-        return cell in self.walls_coords
+        return self._in_bounds(cell) and bool(self._walls[cell[0], cell[1]])
 
     def is_trap(self, cell: Coord) -> bool:
         """Return True when the given cell contains a trap."""
-        return cell in self.traps_coords
+        return self._in_bounds(cell) and bool(self._traps[cell[0], cell[1]])
 
     def is_treasure(self, cell: Coord) -> bool:
         """Return True when the given cell contains a treasure."""
-        return cell in self.treasure_coords
+        return self._in_bounds(cell) and bool(self._treasures[cell[0], cell[1]])
 
     def is_blocked(self, cell: Coord) -> bool:
         """Return True when the given cell cannot contain treasure."""
-        return self.is_wall(cell) or self.is_trap(cell)
+        return self._in_bounds(cell) and bool(self._walls[cell[0], cell[1]] or self._traps[cell[0], cell[1]])
+
+    def walls_mask(self) -> np.ndarray:
+        """Return the boolean wall layer (shared with the grid unless compact; do not modify)."""
+        return np.asarray(self._walls)
+
+    def traps_mask(self) -> np.ndarray:
+        """Return the boolean trap layer (shared with the grid unless compact; do not modify)."""
+        return np.asarray(self._traps)
+
+    def treasures_mask(self) -> np.ndarray:
+        """Return the boolean treasure layer (shared with the grid unless compact; do not modify)."""
+        return np.asarray(self._treasures)
+
+    def treasures_window(self, rows: slice, cols: slice) -> np.ndarray:
+        """Return the boolean treasure layer over a window without unpacking the whole grid."""
+        return np.asarray(self._treasures[rows, cols])
+
+    def blocked_mask(self) -> np.ndarray:
+        """Return a new boolean mask of cells that cannot contain treasure."""
+        return np.asarray(self._walls | self._traps)
+
+    def blocked_flags(self) -> bytearray:
+        """Return the cached flat blocked-cell bytes used by the searches (do not modify).
+
+        Traps and walls are 1, and one trailing 1 stands for the off-grid
+        neighbour sentinel.
+        """
+        if self._blocked_flags is None:
+            self._blocked_flags = build_blocked_flags(self.grid)
+        return self._blocked_flags
+
+    def jump_tables(self) -> np.ndarray:
+        """Return the cached jps scan table for the current walls and traps (read-only)."""
+        if self._jump_tables is None:
+            self._jump_tables = build_jump_tables(self.blocked_flags(), self.grid_size)
+        return self._jump_tables
+
+    @property
+    def blocked_revision(self) -> int:
+        """Number of the next blocked-state change; pass it to blocked_changes later."""
+        return self._blocked_log_start + len(self._blocked_log)
+
+    def blocked_changes(self, since: int) -> list[Coord] | None:
+        """Return cells whose blocked state flipped since revision ``since``.
+
+        Returns None when the whole layout was rebuilt after that revision, in
+        which case the caller has to start over from the current cells.
+        """
+        if since < self._blocked_log_start:
+            return None
+        return self._blocked_log[since - self._blocked_log_start:]
 
     def valid_cells(self) -> list[Coord]:
         """Return all cells where treasure could exist."""
-        return [
-            (row, col)
-            for row in range(self.grid_size)
-            for col in range(self.grid_size)
-            if not self.is_blocked((row, col))
-        ]
+        if self._valid_cells is None:
+            rows, cols = np.divmod(self.valid_indices(), self.grid_size)
+            self._valid_cells = list(zip(rows.tolist(), cols.tolist()))
+        return list(self._valid_cells)
+
+    def valid_mask(self) -> np.ndarray:
+        """Return the cached boolean mask of cells where treasure could exist (do not modify)."""
+        if self._valid_mask is None:
+            self._valid_mask = ~self.blocked_mask()
+        return self._valid_mask
+
+    def valid_indices(self) -> np.ndarray:
+        """Return the cached flat indices of cells where treasure could exist (do not modify)."""
+        if self._valid_indices is None:
+            indices = np.flatnonzero(self.valid_mask())
+            if self.compact:
+                indices = indices.astype(count_dtype(self.grid_size * self.grid_size))
+            self._valid_indices = indices
+        return self._valid_indices
+
+    def valid_count(self) -> int:
+        """Return the number of cells where treasure could exist."""
+        if self._valid_count is None:
+            self._valid_count = int(self.valid_mask().sum())
+        return self._valid_count
 
     def remaining_treasures(self) -> list[Coord]:
         """Return the list of treasure coordinates that still exist."""
@@ -186,53 +415,229 @@ class Grid:
 
     def remove_treasure(self, cell: Coord) -> None:
         """Remove a collected treasure from both the coordinate list and grid."""
-        if cell not in self.treasure_coords:
+        if not self.is_treasure(cell):
             return
 
-        self.treasure_coords.remove(cell)
+        self._own_state()
+        self._adjust_treasure_sums(cell, -1)
+        if self._treasure_coords is not None:
+            self._treasure_coords.remove(cell)
+        self._treasures[cell[0], cell[1]] = False
         self.grid[cell[0], cell[1]] = 4 if cell == self.agent_coords else 0
-
-    def get_cells_in_radius(self, center: Coord, radius: int) -> list[Coord]:
-        """Return in-bounds cells within the given Manhattan radius."""
-        cells = []
+        # Treasure cells are passable either way, so other treasures' maps stay valid.
+        self._treasure_distances.pop(cell, None)
+        self._nearest_treasure = None
+
+    def set_cell(self, cell: Coord, value: int) -> None:
+        """Change one cell to empty (0), treasure (1), trap (2) or wall (3)."""
+        if value not in (0, 1, 2, 3):
+            raise ValueError(f"Unsupported cell value {value}")
+
+        self._own_state()
+        self._own_layout()
+        was_treasure = self.is_treasure(cell)
+        if was_treasure != (value == 1):
+            self._adjust_treasure_sums(cell, 1 if value == 1 else -1)
+
+        # Lists not built yet are derived from the layers later, so only built ones are patched.
+        layout_lists = {1: self._treasure_coords, 2: self._traps_coords, 3: self._walls_coords}
+        for coords in layout_lists.values():
+            if coords is not None and cell in coords:
+                coords.remove(cell)
+        coords = layout_lists.get(value)
+        if coords is not None:
+            coords.append(cell)
+
+        self._treasures[cell[0], cell[1]] = value == 1
+        self._traps[cell[0], cell[1]] = value == 2
+        self._walls[cell[0], cell[1]] = value == 3
+
+        old_value = int(self.grid[cell[0], cell[1]])
+        if value == 0 and cell == self.agent_coords:
+            self.grid[cell[0], cell[1]] = 4
+        else:
+            self.grid[cell[0], cell[1]] = value
+
+        if (old_value in (2, 3)) != (value in (2, 3)):
+            self._treasure_distances = {}
+            self._nearest_treasure = None
+            self._clear_valid_cache()
+            if self._blocked_flags is not None:
+                self._blocked_flags[cell[0] * self.grid_size + cell[1]] = value in (2, 3)
+            self._jump_tables = None
+            self._blocked_log.append((int(cell[0]), int(cell[1])))
+            if self._reachability is not None:
+                self._reachability.update_cell(cell, value not in (2, 3))
+        else:
+            self._treasure_distances.pop(cell, None)
+            self._nearest_treasure = None
+
+    def treasure_within(self, center: Coord, radius: int) -> bool:
+        """Return True when any treasure lies within the given Manhattan radius of center."""
+        if self._treasure_sums is None:
+            treasures = self.treasures_mask()
+            self._treasure_sums = diamond_prefix_sums(treasures, count_dtype(int(treasures.sum())))
+        return bool(diamond_sums(self._treasure_sums, center[0], center[1], radius) > 0)
+
+    def get_radius_window(self, center: Coord, radius: int) -> Tuple[slice, slice, np.ndarray]:
+        """Return (row slice, col slice, kernel view) for a diamond scan clipped to the grid."""
         row_center, col_center = center
+        row_start = max(0, row_center - radius)
+        col_start = max(0, col_center - radius)
+        rows = slice(row_start, min(self.grid_size, row_center + radius + 1))
+        cols = slice(col_start, min(self.grid_size, col_center + radius + 1))
+        kernel = diamond_kernel(radius)[
+            row_start - (row_center - radius):rows.stop - (row_center - radius),
+            col_start - (col_center - radius):cols.stop - (col_center - radius),
+        ]
+        return rows, cols, kernel
 
-        for row in range(max(0, row_center - radius), min(self.grid_size, row_center + radius + 1)):
-            for col in range(max(0, col_center - radius), min(self.grid_size, col_center + radius + 1)):
-                if self._manhattan_distance(center, (row, col)) <= radius:
-                    cells.append((row, col))
+    def get_radius_mask(self, center: Coord, radius: int) -> np.ndarray:
+        """Return a full-grid boolean mask of cells within the given Manhattan radius."""
+        rows, cols, kernel = self.get_radius_window(center, radius)
+        mask = np.zeros((self.grid_size, self.grid_size), dtype=bool)
+        mask[rows, cols] = kernel
+        return mask
 
-        return cells
+    def get_cells_in_radius(self, center: Coord, radius: int) -> list[Coord]:
+        """Return in-bounds cells within the given Manhattan radius."""
+        rows, cols, kernel = self.get_radius_window(center, radius)
+        local_rows, local_cols = np.nonzero(kernel)
+        return list(zip((local_rows + rows.start).tolist(), (local_cols + cols.start).tolist()))
 
     def reset_random(self, seed: int | None = None) -> None:
         """Clear and regenerate a random grid, optionally using a seed."""
         if seed is not None:
-            np.random.seed(seed)
+            self.rng = np.random.default_rng(seed)
 
-        self.grid = np.zeros((self.grid_size, self.grid_size), dtype=int)
+        self.grid = np.zeros((self.grid_size, self.grid_size), dtype=self.cell_dtype)
         self.random_walls = self.calculate_num_walls()
         self.random_traps = self.calculate_num_traps()
         self.treasure_coords = []
         self.traps_coords = []
         self.walls_coords = []
+        self._layout_changed()
         self.generate_random_grid()
 
     def get_shortest_treasure(self, start: Coord) -> Coord | None:
-        min_distance = float('inf')
-        closest_treasure = None
-        for treasure_coord in self.treasure_coords:
-            distance = self._manhattan_distance(start, treasure_coord)
-            if distance < min_distance:
-                min_distance = distance
-                closest_treasure = treasure_coord
-        return closest_treasure
+        """Return the treasure with the shortest path from start, or None if none is reachable."""
+        if self._nearest_treasure is None:
+            self._nearest_treasure = self._build_nearest_treasure()
+
+        index = int(self._nearest_treasure[start])
+        if index < 0:
+            return None
+        return self.treasure_coords[index]
+
+    def treasure_distance_map(self, treasure: Coord) -> np.ndarray:
+        """Return path distances from every cell to the treasure (-1 if unreachable)."""
+        distances = self._treasure_distances.get(treasure)
+        if distances is None:
+            distances = distance_field(self, treasure).distances
+            self._treasure_distances[treasure] = distances
+        return distances
+
+    def _build_nearest_treasure(self) -> np.ndarray:
+        """Combine the treasure maps into a per-cell index of the nearest treasure."""
+        nearest = np.full((self.grid_size, self.grid_size), -1, dtype=np.int32)
+        best = np.full((self.grid_size, self.grid_size), -1, dtype=np.int32)
+
+        for index, treasure in enumerate(self.treasure_coords):
+            distances = self.treasure_distance_map(treasure)
+            closer = (distances >= 0) & ((best < 0) | (distances < best))
+            nearest[closer] = index
+            best[closer] = distances[closer]
+
+        return nearest
+
+    def reachability(self) -> ReachabilityIndex:
+        """Return the connected-component index of passable cells, building it if needed."""
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex(self.grid)
+        return self._reachability
+
+    def _in_bounds(self, cell: Coord) -> bool:
+        return 0 <= cell[0] < self.grid_size and 0 <= cell[1] < self.grid_size
+
+    def _layer(self, value: int) -> np.ndarray | BitLayer:
+        """Return the layer of cells holding value, read from the cell codes."""
+        layer = self.grid == value
+        return BitLayer.from_mask(layer) if self.compact else layer
+
+    @staticmethod
+    def _layer_coords(layer: np.ndarray | BitLayer) -> list[Coord]:
+        rows, cols = np.nonzero(np.asarray(layer))
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def _clear_valid_cache(self) -> None:
+        self._valid_mask = None
+        self._valid_indices = None
+        self._valid_count = None
+        self._valid_cells = None
+
+    def _own_state(self) -> None:
+        """Copy the agent and treasure state if it is still shared with a fork."""
+        if self._owns_state:
+            return
+        self.grid = self.grid.copy()
+        if self._treasure_coords is not None:
+            self._treasure_coords = list(self._treasure_coords)
+        self._treasures = self._treasures.copy()
+        self._treasure_distances = dict(self._treasure_distances)
+        if self._treasure_sums is not None:
+            self._treasure_sums = self._treasure_sums.copy()
+        self._owns_state = True
+
+    def _adjust_treasure_sums(self, cell: Coord, delta: int) -> None:
+        """Add delta treasures at cell to the rotated prefix sums, if they have been built."""
+        if self._treasure_sums is None:
+            return
+        # The table is sized to the treasure count; widen it before a new treasure would overflow it.
+        count = int(self._treasure_sums[-1, -1]) + delta
+        if count > np.iinfo(self._treasure_sums.dtype).max:
+            self._treasure_sums = self._treasure_sums.astype(count_dtype(count))
+        u = cell[0] + cell[1]
+        v = cell[0] - cell[1] + self.grid_size - 1
+        self._treasure_sums[u + 1:, v + 1:] += delta
+
+    def _own_layout(self) -> None:
+        """Copy the wall and trap layout if it is still shared with a fork."""
+        if self._owns_layout:
+            return
+        if self._walls_coords is not None:
+            self._walls_coords = list(self._walls_coords)
+        if self._traps_coords is not None:
+            self._traps_coords = list(self._traps_coords)
+        self._walls = self._walls.copy()
+        self._traps = self._traps.copy()
+        if self._blocked_flags is not None:
+            self._blocked_flags = bytearray(self._blocked_flags)
+        self._blocked_log = list(self._blocked_log)
+        if self._reachability is not None:
+            self._reachability = copy.deepcopy(self._reachability)
+        self._owns_layout = True
+
+    def _layout_changed(self) -> None:
+        """Rebuild the boolean layers from the cell codes and drop layout caches."""
+        # Every caller has just built a fresh cell array and matching (or unset) coordinate lists.
+        self._owns_state = True
+        self._owns_layout = True
+        self._walls = self._layer(3)
+        self._traps = self._layer(2)
+        self._treasures = self._layer(1)
+        self._clear_valid_cache()
+        self._treasure_distances = {}
+        self._nearest_treasure = None
+        self._treasure_sums = None
+        self._blocked_flags = None
+        self._jump_tables = None
+        self._blocked_log_start = self.blocked_revision + 1
+        self._blocked_log = []
+        self._reachability = None
     
     def _manhattan_distance(self, current: Coord, goal: Coord) -> int:
         return abs(current[0] - goal[0]) + abs(current[1] - goal[1])
 
     def _solution_exists(self, start):
-        for goal in self.treasure_coords:
-            result = dfs(self.grid, start, goal)
-            if len(result.path) > 0:
-                return True
-        return False
+        reachability = self.reachability()
+        return any(reachability.connected(start, goal) for goal in self.treasure_coords)
@@ -2,15 +2,14 @@ import tkinter as tk
 import time
 from config import CELL_SIZE, COLORS, SYMBOLS
 from grid import Grid
-from search import SearchResult, bfs, dfs, ucs, greedy, a_star
+from search import SearchResult, bfs, dfs, ucs, greedy, a_star, tour
 from bayesian_agent import BayesianAgent
 
 # Treasure Map
 class TreasureHuntMap:
     def __init__(self, grid: Grid, *, root: tk.Tk | None = None, on_reset=None):
         self.grid = grid
-        self.grid_array = grid.get_grid()
-        self.grid_size = len(self.grid_array)
+        self.grid_size = grid.grid_size
         self.window = root or tk.Tk()
         self.window.title("Treasure Hunt")
         self.window.maxsize(1500,800)
@@ -48,8 +47,11 @@ class TreasureHuntMap:
         tk.Button(controls, text="Run UCS", command=self.run_ucs).pack(side="left", padx=4)
         tk.Button(controls, text="Run Greedy", command=self.run_greedy).pack(side="left", padx=4)
         tk.Button(controls, text="Run A*", command=self.run_a_star).pack(side="left", padx=4)
+        tk.Button(controls, text="Run Tour", command=self.run_tour).pack(side="left", padx=4)
         tk.Button(controls, text="Step Bayesian", command=self.step_bayes).pack(side="left", padx=4)
         tk.Button(controls, text="Run Bayesian", command=self.run_bayes).pack(side="left", padx=4)
+        self._show_explored = tk.BooleanVar(value=False)
+        tk.Checkbutton(controls, text="Show explored", variable=self._show_explored).pack(side="left", padx=4)
         if self._on_reset:
             tk.Button(controls, text="Reset", command=self._on_reset).pack(side="left", padx=4)
         else:
@@ -64,6 +66,8 @@ class TreasureHuntMap:
         self._metrics_label.pack(fill="x", padx=10, pady=(2, 10))
     def draw_grid(self):
         self.canvas.delete("all")
+        # Re-fetch the cells every draw: the grid swaps in a private copy on its first write after a fork.
+        cells = self.grid.get_grid()
         for row in range(self.grid_size):
             for col in range(self.grid_size):
                 x1 = col * CELL_SIZE
@@ -71,7 +75,7 @@ class TreasureHuntMap:
                 x2 = x1 + CELL_SIZE
                 y2 = y1 + CELL_SIZE
                 
-                cell_value = self.grid_array[row][col]
+                cell_value = cells[row][col]
                 
                 match cell_value:
                     case 0:
@@ -106,7 +110,6 @@ class TreasureHuntMap:
                     )
 
     def update_agent_position(self):
-        self.grid_array = self.grid.get_grid()
         self.draw_grid()
 
     def step_bayes(self):
@@ -156,6 +159,21 @@ class TreasureHuntMap:
             self.canvas.delete(item_id)
         self._path_items.clear()
 
+        if result.explored is not None:
+            for row, col in result.explored.tolist():
+                x1 = col * CELL_SIZE
+                y1 = row * CELL_SIZE
+                pad = 12
+                item_id = self.canvas.create_oval(
+                    x1 + pad,
+                    y1 + pad,
+                    x1 + CELL_SIZE - pad,
+                    y1 + CELL_SIZE - pad,
+                    fill=COLORS["explored"],
+                    outline="",
+                )
+                self._path_items.append(item_id)
+
         path = result.path
         if path:
             for (row, col) in path:
@@ -184,13 +202,13 @@ class TreasureHuntMap:
     def _run_search(self, algo_name: str, func):
         start = self.grid.agent_coords
         goal = self.grid.get_shortest_treasure(start) or (self.grid_size - 1, self.grid_size - 1)
-        result = func(self.grid_array, start, goal)
+        result = func(self.grid, start, goal, trace=self._show_explored.get())
         self._show_result(algo_name, result)
 
     def _run_search_greedy(self, algo_name: str, func):
         start = self.grid.agent_coords
         goal_array = self.grid.treasure_coords
-        result = func(self.grid_array, start, goal_array)
+        result = func(self.grid, start, goal_array, trace=self._show_explored.get())
         self._show_result(algo_name, result)
 
     def run_bfs(self):
@@ -208,6 +226,9 @@ class TreasureHuntMap:
     def run_a_star(self):
         self._run_search("A*", a_star)
 
+    def run_tour(self):
+        self._run_search_greedy("Tour", tour)
+
     def destroy(self):
         self.frame.destroy()
 
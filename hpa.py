@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Deque, Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+
+from search import BLOCKED_VALUES, SearchResult, _cell_array, _ChangeCursor
+
+Coord = Tuple[int, int]
+ClusterId = Tuple[int, int]
+BorderId = Tuple[str, int, int]
+
+DEFAULT_CLUSTER_SIZE = 16
+
+# Border runs at least this long get an entrance at each end instead of one in the middle.
+ENTRANCE_SPLIT_LENGTH = 6
+
+
+@lru_cache(maxsize=16)
+def _rect_neighbors(height: int, width: int) -> List[Tuple[int, ...]]:
+    """Return local flat neighbour indices for every cell of a height x width block."""
+    neighbors = []
+    for row in range(height):
+        for col in range(width):
+            cell = []
+            if row > 0:
+                cell.append((row - 1) * width + col)
+            if col + 1 < width:
+                cell.append(row * width + col + 1)
+            if row + 1 < height:
+                cell.append((row + 1) * width + col)
+            if col > 0:
+                cell.append(row * width + col - 1)
+            neighbors.append(tuple(cell))
+    return neighbors
+
+
+@dataclass
+class _Route:
+    """Partially refined path that next_cell keeps while the agent follows it."""
+
+    goal: Coord
+    position: Coord
+    segments: Iterator[List[Coord]]
+    cells: Deque[Coord] = field(default_factory=deque)
+
+
+class HierarchicalPlanner:
+    """Hierarchical path-finding (HPA*) over square clusters of a grid.
+
+    The grid is cut into ``cluster_size`` squares. Every passable run along a
+    shared cluster border gets one or two entrance transitions; the entrance
+    cells are the abstract nodes. Nodes in the same cluster are joined by their
+    in-cluster BFS distance and transitions by a unit edge. Queries search this
+    small graph and refine it into cells one segment at a time. Paths are
+    near-optimal: they always pass through entrance cells.
+
+    Entrances are found up front; intra-cluster distances are computed the
+    first time a search enters a cluster and kept until that cluster changes.
+    Call ``precompute`` to build every cluster eagerly. Built from a Grid,
+    ``sync`` replays the grid's blocked-cell changes instead of diffing it.
+    """
+
+    def __init__(self, grid, cluster_size: int = DEFAULT_CLUSTER_SIZE):
+        if cluster_size < 2:
+            raise ValueError("Cluster size must be at least 2")
+
+        cells = _cell_array(grid)
+        self.size = len(cells)
+        self.cluster_size = cluster_size
+        self.cluster_count = -(-self.size // cluster_size)
+        self.blocked = np.isin(cells, BLOCKED_VALUES)
+
+        self.transitions: Dict[BorderId, List[Tuple[int, int]]] = {}
+        self.nodes: Dict[ClusterId, Set[int]] = {}
+        self.links: Dict[int, List[int]] = {}
+        self._intra: Dict[ClusterId, Dict[int, Dict[int, int]]] = {}
+        self._route: _Route | None = None
+        self._changes = _ChangeCursor(grid)
+
+        for border in self._all_borders():
+            self.transitions[border] = self._find_transitions(border)
+        self._build_nodes()
+
+    # ------------------------------------------------------------------
+    # Abstract graph construction
+    # ------------------------------------------------------------------
+    def _cluster_of(self, index: int) -> ClusterId:
+        row, col = divmod(index, self.size)
+        return row // self.cluster_size, col // self.cluster_size
+
+    def _bounds(self, cluster: ClusterId) -> Tuple[int, int, int, int]:
+        row_start = cluster[0] * self.cluster_size
+        col_start = cluster[1] * self.cluster_size
+        return (
+            row_start,
+            min(row_start + self.cluster_size, self.size),
+            col_start,
+            min(col_start + self.cluster_size, self.size),
+        )
+
+    def _all_borders(self) -> Iterator[BorderId]:
+        for cluster_row in range(self.cluster_count):
+            for cluster_col in range(self.cluster_count):
+                if cluster_col + 1 < self.cluster_count:
+                    yield "h", cluster_row, cluster_col
+                if cluster_row + 1 < self.cluster_count:
+                    yield "v", cluster_row, cluster_col
+
+    def _borders_of(self, cluster: ClusterId) -> List[BorderId]:
+        cluster_row, cluster_col = cluster
+        borders = []
+        if cluster_col + 1 < self.cluster_count:
+            borders.append(("h", cluster_row, cluster_col))
+        if cluster_col > 0:
+            borders.append(("h", cluster_row, cluster_col - 1))
+        if cluster_row + 1 < self.cluster_count:
+            borders.append(("v", cluster_row, cluster_col))
+        if cluster_row > 0:
+            borders.append(("v", cluster_row - 1, cluster_col))
+        return borders
+
+    def _border_clusters(self, border: BorderId) -> Tuple[ClusterId, ClusterId]:
+        kind, cluster_row, cluster_col = border
+        if kind == "h":
+            return (cluster_row, cluster_col), (cluster_row, cluster_col + 1)
+        return (cluster_row, cluster_col), (cluster_row + 1, cluster_col)
+
+    def _find_transitions(self, border: BorderId) -> List[Tuple[int, int]]:
+        """Return (cell, cell) pairs crossing the border, one or two per open run."""
+        kind = border[0]
+        first, _ = self._border_clusters(border)
+        row_start, row_stop, col_start, col_stop = self._bounds(first)
+
+        if kind == "h":
+            open_pairs = ~self.blocked[row_start:row_stop, col_stop - 1] & ~self.blocked[row_start:row_stop, col_stop]
+            offsets = np.arange(row_start, row_stop)
+            near = offsets * self.size + col_stop - 1
+            step = 1
+        else:
+            open_pairs = ~self.blocked[row_stop - 1, col_start:col_stop] & ~self.blocked[row_stop, col_start:col_stop]
+            offsets = np.arange(col_start, col_stop)
+            near = (row_stop - 1) * self.size + offsets
+            step = self.size
+
+        # Runs of open pairs start where the padded mask rises and end where it falls.
+        edges = np.diff(np.concatenate(([0], open_pairs.astype(np.int8), [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_stops = np.flatnonzero(edges == -1)
+
+        transitions = []
+        for run_start, run_stop in zip(run_starts.tolist(), run_stops.tolist()):
+            if run_stop - run_start >= ENTRANCE_SPLIT_LENGTH:
+                picks = (run_start, run_stop - 1)
+            else:
+                picks = ((run_start + run_stop - 1) // 2,)
+            for pick in picks:
+                cell = int(near[pick])
+                transitions.append((cell, cell + step))
+        return transitions
+
+    def _build_nodes(self) -> None:
+        """Derive per-cluster entrance nodes and unit links from the transitions."""
+        self.nodes = {
+            (cluster_row, cluster_col): set()
+            for cluster_row in range(self.cluster_count)
+            for cluster_col in range(self.cluster_count)
+        }
+        self.links = {}
+        for border, transitions in self.transitions.items():
+            first, second = self._border_clusters(border)
+            for near, far in transitions:
+                self.nodes[first].add(near)
+                self.nodes[second].add(far)
+            self._link(transitions)
+
+    def _link(self, transitions: List[Tuple[int, int]]) -> None:
+        for near, far in transitions:
+            self.links.setdefault(near, []).append(far)
+            self.links.setdefault(far, []).append(near)
+
+    def _unlink(self, transitions: List[Tuple[int, int]]) -> None:
+        for near, far in transitions:
+            for node, other in ((near, far), (far, near)):
+                others = self.links[node]
+                others.remove(other)
+                if not others:
+                    del self.links[node]
+
+    def _cluster_nodes(self, cluster: ClusterId) -> Set[int]:
+        """Collect a cluster's entrance nodes from the transitions of its borders."""
+        nodes = set()
+        for border in self._borders_of(cluster):
+            first, _ = self._border_clusters(border)
+            side = 0 if first == cluster else 1
+            nodes.update(pair[side] for pair in self.transitions[border])
+        return nodes
+
+    def cluster_edges(self, cluster: ClusterId) -> Dict[int, Dict[int, int]]:
+        """Return in-cluster distances between the cluster's entrance nodes."""
+        edges = self._intra.get(cluster)
+        if edges is not None:
+            return edges
+
+        nodes = self.nodes[cluster]
+        edges = {}
+        for node in nodes:
+            distances = self._local_distances(node, cluster, nodes)
+            edges[node] = {other: cost for other, cost in distances.items() if other != node}
+        self._intra[cluster] = edges
+        return edges
+
+    def precompute(self) -> None:
+        """Build intra-cluster edges for every cluster now instead of on first use."""
+        for cluster in self.nodes:
+            self.cluster_edges(cluster)
+
+    def _local_bfs(self, source: int, cluster: ClusterId, targets=None):
+        """BFS restricted to one cluster in local indices.
+
+        Returns (distance list, parent list, bounds). With ``targets`` (global
+        indices) the search stops once all of them have been reached.
+        """
+        bounds = self._bounds(cluster)
+        row_start, row_stop, col_start, col_stop = bounds
+        width = col_stop - col_start
+        blocked = self.blocked[row_start:row_stop, col_start:col_stop].ravel().tolist()
+        neighbors = _rect_neighbors(row_stop - row_start, width)
+
+        row, col = divmod(source, self.size)
+        origin = (row - row_start) * width + (col - col_start)
+        distances = [-1] * len(blocked)
+        parent = [-1] * len(blocked)
+        distances[origin] = 0
+
+        remaining = -1
+        wanted = None
+        if targets is not None:
+            wanted = bytearray(len(blocked))
+            for target in targets:
+                target_row, target_col = divmod(target, self.size)
+                wanted[(target_row - row_start) * width + (target_col - col_start)] = 1
+            remaining = sum(wanted) - wanted[origin]
+
+        queue = deque([origin])
+        while queue and remaining != 0:
+            current = queue.popleft()
+            next_distance = distances[current] + 1
+            for nb in neighbors[current]:
+                if distances[nb] >= 0 or blocked[nb]:
+                    continue
+                distances[nb] = next_distance
+                parent[nb] = current
+                queue.append(nb)
+                if wanted is not None and wanted[nb]:
+                    remaining -= 1
+        return distances, parent, bounds
+
+    def _local_distances(self, source: int, cluster: ClusterId, targets) -> Dict[int, int]:
+        """Return in-cluster distances from source to each reachable target (global indices)."""
+        distances, _, (row_start, _, col_start, col_stop) = self._local_bfs(source, cluster, targets)
+        width = col_stop - col_start
+        found = {}
+        for target in targets:
+            row, col = divmod(target, self.size)
+            distance = distances[(row - row_start) * width + (col - col_start)]
+            if distance >= 0:
+                found[target] = distance
+        return found
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def sync(self, grid) -> int:
+        """Rebuild only the clusters touched by cells whose blocked state changed.
+
+        A Grid reports its changed cells directly; a bare cell array (or a
+        Grid whose layout was regenerated) is diffed against the planner's
+        copy of the blocked mask. Returns the number of changed cells.
+        """
+        flips = self._changes.flips(grid, lambda cell: bool(self.blocked[cell]))
+
+        if flips is None:
+            blocked = np.isin(_cell_array(grid), BLOCKED_VALUES)
+            changed = [(int(row), int(col)) for row, col in np.argwhere(blocked != self.blocked)]
+            self.blocked = blocked
+        else:
+            changed = []
+            for cell, state in flips:
+                self.blocked[cell] = state
+                changed.append(cell)
+
+        if changed:
+            self.update_cells(changed)
+        return len(changed)
+
+    def update_cells(self, cells: List[Coord]) -> None:
+        """Refresh entrances and intra-cluster edges around the given cells.
+
+        ``self.blocked`` must already reflect the new cell states; ``sync``
+        takes care of that when working from a grid. Only the borders of the
+        touched clusters and the clusters on either side of them are patched.
+        """
+        touched = {(row // self.cluster_size, col // self.cluster_size) for row, col in cells}
+
+        borders = set()
+        for cluster in touched:
+            borders.update(self._borders_of(cluster))
+
+        stale = set(touched)
+        for border in borders:
+            self._unlink(self.transitions[border])
+            self.transitions[border] = self._find_transitions(border)
+            self._link(self.transitions[border])
+            stale.update(self._border_clusters(border))
+
+        for cluster in stale:
+            self.nodes[cluster] = self._cluster_nodes(cluster)
+            self._intra.pop(cluster, None)
+        self._route = None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def abstract_path(self, start: Coord, goal: Coord) -> Tuple[List[int], int]:
+        """Search the abstract graph; return (node path from start to goal, nodes expanded)."""
+        size = self.size
+        source = int(start[0]) * size + int(start[1])
+        target = int(goal[0]) * size + int(goal[1])
+        if self.blocked[goal[0], goal[1]]:
+            return [], 0
+        if source == target:
+            return [source], 0
+
+        start_cluster = self._cluster_of(source)
+        goal_cluster = self._cluster_of(target)
+
+        start_targets = set(self.nodes[start_cluster])
+        if start_cluster == goal_cluster:
+            start_targets.add(target)
+        start_edges = self._local_distances(source, start_cluster, start_targets)
+        goal_edges = self._local_distances(target, goal_cluster, self.nodes[goal_cluster])
+        nodes_expanded = 0
+
+        goal_row, goal_col = int(goal[0]), int(goal[1])
+
+        def heuristic(index: int) -> int:
+            row, col = divmod(index, size)
+            return abs(row - goal_row) + abs(col - goal_col)
+
+        def successors(index: int) -> Iterator[Tuple[int, int]]:
+            if index == source:
+                yield from start_edges.items()
+            cluster = self._cluster_of(index)
+            if index in self.nodes[cluster]:
+                yield from self.cluster_edges(cluster)[index].items()
+                for far in self.links.get(index, ()):
+                    yield far, 1
+            if index in goal_edges:
+                yield target, goal_edges[index]
+
+        g_score = {source: 0}
+        parent: Dict[int, int] = {}
+        closed = set()
+        # Ties on f go to the deeper node, as in search.a_star.
+        heap = [(heuristic(source), 0, source)]
+        while heap:
+            _, negative_g, current = heapq.heappop(heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            nodes_expanded += 1
+
+            if current == target:
+                path = [target]
+                while path[-1] != source:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path, nodes_expanded
+
+            g = -negative_g
+            for nb, cost in successors(current):
+                new_g = g + cost
+                if nb in closed or g_score.get(nb, new_g + 1) <= new_g:
+                    continue
+                g_score[nb] = new_g
+                parent[nb] = current
+                heapq.heappush(heap, (new_g + heuristic(nb), -new_g, nb))
+
+        return [], nodes_expanded
+
+    def refine(self, abstract: List[int]) -> Iterator[List[Coord]]:
+        """Lazily turn an abstract node path into cell segments, one per abstract edge."""
+        for current, following in zip(abstract, abstract[1:]):
+            if current == following:
+                continue
+            if following in self.links.get(current, ()):
+                yield [divmod(following, self.size)]
+                continue
+
+            _, parent, (row_start, _, col_start, col_stop) = self._local_bfs(
+                current, self._cluster_of(current), (following,)
+            )
+            width = col_stop - col_start
+            row, col = divmod(following, self.size)
+            cell = (row - row_start) * width + (col - col_start)
+            segment = []
+            while parent[cell] >= 0:
+                local_row, local_col = divmod(cell, width)
+                segment.append((row_start + local_row, col_start + local_col))
+                cell = parent[cell]
+            segment.reverse()
+            yield segment
+
+    def next_cell(self, start: Coord, goal: Coord) -> Coord | None:
+        """Return the first move toward goal.
+
+        The refined route is kept between calls, so an agent that keeps
+        following it pays for one abstract search and refines each segment
+        only when it reaches it.
+        """
+        start = (int(start[0]), int(start[1]))
+        goal = (int(goal[0]), int(goal[1]))
+
+        route = self._route
+        if route is None or route.goal != goal or route.position != start:
+            abstract, _ = self.abstract_path(start, goal)
+            route = _Route(goal=goal, position=start, segments=self.refine(abstract))
+
+        while not route.cells:
+            segment = next(route.segments, None)
+            if segment is None:
+                self._route = None
+                return None
+            route.cells.extend(segment)
+
+        route.position = route.cells.popleft()
+        self._route = route
+        return route.position
+
+    def find_path(self, start: Coord, goal: Coord) -> SearchResult:
+        """Return the fully refined path from start to goal."""
+        t0 = time.perf_counter()
+
+        abstract, nodes_expanded = self.abstract_path(start, goal)
+        path: List[Coord] = []
+        if abstract:
+            path.append((int(start[0]), int(start[1])))
+            for segment in self.refine(abstract):
+                path.extend(segment)
+
+        t1 = time.perf_counter()
+        return SearchResult(path=path, nodes_expanded=nodes_expanded, runtime=t1 - t0)
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+from search import BLOCKED_VALUES, count_dtype
+
+Coord = Tuple[int, int]
+
+# Half-width of the box used to prove a blocked cell did not split its component.
+LOCAL_CHECK_RADIUS = 3
+
+# Pieces up to this many cells are cut off by flood fill instead of relabelling the whole component.
+POCKET_LIMIT = 4096
+
+
+def label_components(passable: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Label 4-connected components of passable cells in one vectorized pass.
+
+    Each row is split into horizontal runs of passable cells; runs that touch
+    vertically are merged with array-wide hook-and-shortcut union-find.
+    Returns (labels, component count) with -1 on blocked cells; labels use
+    the narrowest integer type that holds the count.
+    """
+    passable = np.asarray(passable, dtype=bool)
+    run_starts = passable.copy()
+    run_starts[:, 1:] &= ~passable[:, :-1]
+    run_count = int(run_starts.sum())
+
+    if run_count == 0:
+        return np.full(passable.shape, -1, dtype=np.int8), 0
+
+    run_id = (np.cumsum(run_starts.ravel()) - 1).reshape(passable.shape).astype(np.int32)
+
+    touching = passable[:-1] & passable[1:]
+    upper = run_id[:-1][touching]
+    lower = run_id[1:][touching]
+
+    root = np.arange(run_count, dtype=np.int32)
+    while upper.size:
+        upper_root = root[upper]
+        lower_root = root[lower]
+        split = upper_root != lower_root
+        if not split.any():
+            break
+        # Hook the larger root under the smaller one, then flatten every chain.
+        upper_root = upper_root[split]
+        lower_root = lower_root[split]
+        np.minimum.at(root, np.maximum(upper_root, lower_root), np.minimum(upper_root, lower_root))
+        while True:
+            flattened = root[root]
+            if np.array_equal(flattened, root):
+                break
+            root = flattened
+
+    _, run_label = np.unique(root, return_inverse=True)
+    count = int(run_label.max()) + 1
+    labels = np.full(passable.shape, -1, dtype=count_dtype(count))
+    labels[passable] = run_label.astype(labels.dtype)[run_id[passable]]
+    return labels, count
+
+
+class ReachabilityIndex:
+    """Connected-component labels of passable cells for O(1) reachability queries.
+
+    Each label also keeps its cell count and a bounding box (top, bottom, left,
+    right, ends exclusive), so update_cell only rewrites labels inside the box
+    of the components it changes. Boxes are never shrunk; a box that is larger
+    than its component is still correct, just slower to rewrite.
+    """
+
+    def __init__(self, grid):
+        cells = np.asarray(grid)
+        # Labels are never reused: merges keep an existing label and splits take fresh ones.
+        # They start in the narrowest type that fits and are widened when fresh labels outgrow it.
+        self.labels, self.next_label = label_components(~np.isin(cells, BLOCKED_VALUES))
+        rows, cols = np.nonzero(self.labels >= 0)
+        self._sizes = np.zeros(0, dtype=np.int64)
+        self._boxes = np.zeros((0, 4), dtype=np.int32)
+        self._reserve(self.next_label)
+        self._record(self.labels[rows, cols], rows, cols)
+
+    def label(self, cell: Coord) -> int:
+        """Return the component label of a cell (-1 for blocked cells)."""
+        return int(self.labels[cell[0], cell[1]])
+
+    def connected(self, a: Coord, b: Coord) -> bool:
+        """Return True when both cells are passable and in the same component."""
+        label = self.labels[a[0], a[1]]
+        return bool(label >= 0 and label == self.labels[b[0], b[1]])
+
+    def component_mask(self, cell: Coord) -> np.ndarray:
+        """Return a boolean mask of every cell reachable from cell."""
+        label = self.labels[cell[0], cell[1]]
+        mask = np.zeros(self.labels.shape, dtype=bool)
+        if label < 0:
+            return mask
+        window = self._window(int(label))
+        mask[window] = self.labels[window] == label
+        return mask
+
+    def update_cell(self, cell: Coord, passable: bool) -> None:
+        """Patch the labels after one cell became passable or blocked."""
+        row, col = cell
+        current = int(self.labels[row, col])
+        if (current >= 0) == passable:
+            return
+
+        size_rows, size_cols = self.labels.shape
+        open_cells = [
+            (next_row, next_col)
+            for next_row, next_col in ((row - 1, col), (row, col + 1), (row + 1, col), (row, col - 1))
+            if 0 <= next_row < size_rows and 0 <= next_col < size_cols and self.labels[next_row, next_col] >= 0
+        ]
+        touching = {int(self.labels[next_row, next_col]) for next_row, next_col in open_cells}
+
+        if passable:
+            # Opening a cell can only merge the components around it.
+            if not touching:
+                label = self._new_label()
+                self.labels[row, col] = label
+                self._boxes[label] = (row, row + 1, col, col + 1)
+                self._sizes[label] = 1
+                return
+            # The largest component keeps its label; only the smaller ones are rewritten, inside their boxes.
+            merged = max(touching, key=lambda label: self._sizes[label])
+            box = self._boxes[merged]
+            for label in touching - {merged}:
+                region = self.labels[self._window(label)]
+                region[region == label] = merged
+                other = self._boxes[label]
+                box[0], box[2] = min(box[0], other[0]), min(box[2], other[2])
+                box[1], box[3] = max(box[1], other[1]), max(box[3], other[3])
+                self._sizes[merged] += self._sizes[label]
+            box[0], box[2] = min(box[0], row), min(box[2], col)
+            box[1], box[3] = max(box[1], row + 1), max(box[3], col + 1)
+            self._sizes[merged] += 1
+            self.labels[row, col] = merged
+            return
+
+        # Blocking a cell can only split its own component, so relabel just that one.
+        self.labels[row, col] = -1
+        self._sizes[current] -= 1
+        if len(open_cells) <= 1:
+            return
+
+        # Usually the neighbours still meet around the new wall close by; then nothing splits.
+        local = (
+            slice(max(row - LOCAL_CHECK_RADIUS, 0), row + LOCAL_CHECK_RADIUS + 1),
+            slice(max(col - LOCAL_CHECK_RADIUS, 0), col + LOCAL_CHECK_RADIUS + 1),
+        )
+        local_labels, _ = label_components(self.labels[local] == current)
+        local_row = row - local[0].start
+        local_col = col - local[1].start
+        around = {
+            int(local_labels[next_row, next_col])
+            for next_row, next_col in (
+                (local_row - 1, local_col),
+                (local_row, local_col + 1),
+                (local_row + 1, local_col),
+                (local_row, local_col - 1),
+            )
+            if 0 <= next_row < local_labels.shape[0]
+            and 0 <= next_col < local_labels.shape[1]
+            and local_labels[next_row, next_col] >= 0
+        }
+        if len(around) == 1:
+            return
+
+        if self._split_pockets(current, open_cells):
+            return
+
+        # Several pieces may be large: relabel the component inside its box; the largest piece keeps the old label.
+        window = self._window(current)
+        local_labels, local_count = label_components(self.labels[window] == current)
+        if local_count <= 1:
+            return
+        piece_sizes = np.bincount(local_labels[local_labels >= 0], minlength=local_count)
+        keep = int(np.argmax(piece_sizes))
+        rows, cols = np.nonzero((local_labels >= 0) & (local_labels != keep))
+        self._reserve(self.next_label + local_count - 1)
+        region = self.labels[window]
+        relabel = np.arange(self.next_label, self.next_label + local_count)
+        relabel[keep + 1:] -= 1
+        self.next_label += local_count - 1
+        new_labels = relabel[local_labels[rows, cols]]
+        region[rows, cols] = new_labels.astype(self.labels.dtype)
+        self._sizes[current] = piece_sizes[keep]
+        self._record(new_labels, rows + window[0].start, cols + window[1].start)
+
+    def _split_pockets(self, current: int, seeds: list[Coord]) -> bool:
+        """Give fresh labels to the small pieces of current that the seeds fall into.
+
+        Floods from each seed, up to POCKET_LIMIT cells. Returns False, changing
+        nothing, when two or more pieces may be larger than that.
+        """
+        labels = self.labels
+        size_rows, size_cols = labels.shape
+        group = list(range(len(seeds)))
+        reached: set[Coord] = set()
+        pockets: dict[int, set[Coord]] = {}
+
+        def find(index: int) -> int:
+            while group[index] != index:
+                index = group[index]
+            return index
+
+        for index, seed in enumerate(seeds):
+            if seed in reached:
+                continue
+            visited = {seed}
+            stack = [seed]
+            while stack and len(visited) <= POCKET_LIMIT:
+                row, col = stack.pop()
+                for next_cell in ((row - 1, col), (row, col + 1), (row + 1, col), (row, col - 1)):
+                    next_row, next_col = next_cell
+                    if (
+                        0 <= next_row < size_rows
+                        and 0 <= next_col < size_cols
+                        and next_cell not in visited
+                        and labels[next_row, next_col] == current
+                    ):
+                        visited.add(next_cell)
+                        stack.append(next_cell)
+            for other, other_seed in enumerate(seeds):
+                if other_seed in visited:
+                    group[find(other)] = find(index)
+            reached |= visited
+            if not stack:
+                pockets[index] = visited
+
+        roots = {find(index) for index in range(len(seeds))}
+        complete = {find(index): cells for index, cells in pockets.items()}
+        large = roots - complete.keys()
+        if len(large) > 1:
+            return False
+        if len(roots) == 1:
+            return True
+        if not large:
+            # Every piece is small; the largest keeps the old label.
+            del complete[max(complete, key=lambda root: len(complete[root]))]
+
+        for cells in complete.values():
+            label = self._new_label()
+            rows, cols = np.array(list(cells), dtype=np.int32).T
+            self.labels[rows, cols] = label
+            self._sizes[current] -= len(cells)
+            self._record(np.full(len(cells), label), rows, cols)
+        return True
+
+    def _window(self, label: int) -> Tuple[slice, slice]:
+        top, bottom, left, right = self._boxes[label].tolist()
+        return slice(top, bottom), slice(left, right)
+
+    def _record(self, labels: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> None:
+        """Accumulate the cells of fresh labels into their (still empty) sizes and boxes."""
+        labels = labels.astype(np.intp)
+        # Matching the table dtype keeps the ufunc.at calls on their fast path.
+        rows = rows.astype(np.int32)
+        cols = cols.astype(np.int32)
+        np.add.at(self._sizes, labels, 1)
+        boxes = self._boxes
+        np.minimum.at(boxes[:, 0], labels, rows)
+        np.maximum.at(boxes[:, 1], labels, rows + 1)
+        np.minimum.at(boxes[:, 2], labels, cols)
+        np.maximum.at(boxes[:, 3], labels, cols + 1)
+
+    def _new_label(self) -> int:
+        label = self.next_label
+        self.next_label += 1
+        self._reserve(self.next_label)
+        return label
+
+    def _reserve(self, label_count: int) -> None:
+        """Widen the label array and grow the size and box tables for labels below label_count."""
+        if label_count - 1 > np.iinfo(self.labels.dtype).max:
+            self.labels = self.labels.astype(count_dtype(label_count - 1))
+        if label_count > self._sizes.size:
+            extra = max(label_count, 2 * self._sizes.size) - self._sizes.size
+            # Empty boxes start inverted so the first cell recorded sets every edge.
+            empty = np.tile(np.array([np.iinfo(np.int32).max, 0, np.iinfo(np.int32).max, 0], dtype=np.int32), (extra, 1))
+            self._sizes = np.concatenate((self._sizes, np.zeros(extra, dtype=np.int64)))
+            self._boxes = np.concatenate((self._boxes, empty))
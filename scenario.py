@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Dict, Iterable, List, Tuple, TypedDict
+
+import numpy as np
+
+Coord = Tuple[int, int]
+
+
+class Layout(TypedDict):
+    """Cell coordinates of one hand-built layout."""
+
+    agent: Coord
+    treasures: List[Coord]
+    traps: List[Coord]
+    walls: List[Coord]
+
+
+# Named hand-built layouts, given as coordinates on a 20 x 20 board.
+LAYOUTS: Dict[str, Layout] = {
+    "default": {
+        "agent": (10, 10),
+        "treasures": [(3, 17), (17, 3)],
+        "traps": [(3, 16), (4, 17), (16, 3), (17, 4)],
+        "walls": [
+            (1, 8), (2, 8), (3, 9), (4, 9), (5, 15),
+            (6, 12), (7, 7), (8, 13), (10, 6), (11, 10),
+            (13, 3), (14, 14), (15, 6), (17, 18),
+            (18, 9), (5, 4), (9, 4), (12, 16),
+        ],
+    },
+    # PROMPT 1: Medium Noise Treasure Hunt
+    "prompt1": {
+        "agent": (2, 2),
+        "treasures": [(6, 8)],
+        "traps": [(5, 7), (14, 13)],
+        "walls": [
+            (4, 5), (4, 6), (4, 7),
+            (9, 10), (10, 10), (11, 10),
+            (12, 4), (13, 4), (14, 4),
+            (16, 11),
+        ],
+    },
+    # PROMPT 2: High Noise Treasure Hunt
+    "prompt2": {
+        "agent": (18, 3),
+        "treasures": [(5, 16), (11, 11), (17, 14)],
+        "traps": [(6, 15), (10, 12), (16, 13)],
+        "walls": [
+            (3, 8), (4, 8), (5, 8),
+            (8, 4), (8, 5), (8, 6),
+            (10, 15), (11, 15), (12, 15),
+            (13, 9), (14, 9), (15, 9),
+        ],
+    },
+}
+
+SCENARIO_MAGIC = b"THSC"
+SCENARIO_VERSION = 1
+# Fixed 16-byte header; the (count, size, size) uint8 cell codes follow it directly.
+SCENARIO_HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("reserved", "<u2"),
+    ("count", "<u4"),
+    ("size", "<u4"),
+])
+
+
+# Scenario pools: random maps with about as many walls per cell as Grid.generate_random_grid.
+POOL_CACHE_DIR = "scenario_cache"
+POOL_WALL_DENSITY = 0.02
+POOL_TRAPS = 2
+POOL_TREASURES = 2
+# Upper bound on cells generated and validated per vectorized batch.
+POOL_BATCH_CELLS = 1 << 22
+POOL_MAX_ATTEMPTS = 100
+
+
+def layout_codes(name: str, size: int = 20) -> np.ndarray:
+    """Return the uint8 cell codes of a named layout on a size x size board."""
+    layout = LAYOUTS[name]
+    codes = np.zeros((size, size), dtype=np.uint8)
+    for value, cells in ((1, layout["treasures"]), (2, layout["traps"]), (3, layout["walls"])):
+        for row, col in cells:
+            codes[row, col] = value
+    codes[layout["agent"]] = 4
+    return codes
+
+
+def create_scenarios(path: str, count: int, size: int) -> np.memmap:
+    """Create a scenario file and return a writable (count, size, size) memmap of its cells."""
+    header = np.zeros(1, dtype=SCENARIO_HEADER)
+    header["magic"] = SCENARIO_MAGIC
+    header["version"] = SCENARIO_VERSION
+    header["count"] = count
+    header["size"] = size
+    with open(path, "wb") as handle:
+        handle.write(header.tobytes())
+        handle.truncate(SCENARIO_HEADER.itemsize + count * size * size)
+    return np.memmap(path, dtype=np.uint8, mode="r+", offset=SCENARIO_HEADER.itemsize, shape=(count, size, size))
+
+
+def save_scenarios(path: str, codes: np.ndarray) -> None:
+    """Write one (size, size) map or a (count, size, size) stack of cell codes to a scenario file."""
+    codes = np.asarray(codes)
+    if codes.ndim == 2:
+        codes = codes[np.newaxis]
+    if codes.ndim != 3 or codes.shape[1] != codes.shape[2]:
+        raise ValueError(f"Expected square maps, got shape {codes.shape}")
+    if codes.size and (codes.min() < 0 or codes.max() > 4):
+        raise ValueError("Cell codes must be between 0 and 4")
+
+    cells = create_scenarios(path, codes.shape[0], codes.shape[1])
+    cells[:] = codes
+    cells.flush()
+
+
+def load_scenarios(path: str) -> np.memmap:
+    """Memory-map a scenario file as a read-only (count, size, size) uint8 array."""
+    header = np.fromfile(path, dtype=SCENARIO_HEADER, count=1)
+    if header.size == 0 or header["magic"][0] != SCENARIO_MAGIC:
+        raise ValueError(f"{path} is not a scenario file")
+    if header["version"][0] != SCENARIO_VERSION:
+        raise ValueError(f"Unsupported scenario version {int(header['version'][0])}")
+
+    count = int(header["count"][0])
+    size = int(header["size"][0])
+    return np.memmap(path, dtype=np.uint8, mode="r", offset=SCENARIO_HEADER.itemsize, shape=(count, size, size))
+
+
+def generate_pool(
+    size: int,
+    seeds: Iterable[int],
+    wall_density: float = POOL_WALL_DENSITY,
+    num_traps: int = POOL_TRAPS,
+    num_treasures: int = POOL_TREASURES,
+) -> np.ndarray:
+    """Generate one solvable random map per seed as a (count, size, size) uint8 array.
+
+    Each seed owns its random stream, so a seed's map does not depend on the
+    rest of the range. Placement and validation run over whole batches.
+    """
+    seeds = list(seeds)
+    cell_count = size * size
+    num_walls = int(round(wall_density * cell_count))
+    values = np.repeat(np.array([4, 1, 2, 3], dtype=np.uint8), [1, num_treasures, num_traps, num_walls])
+    if values.size > cell_count:
+        raise ValueError(f"Cannot place {values.size} items on {cell_count} cells")
+
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    pool = np.zeros((len(seeds), size, size), dtype=np.uint8)
+    batch = max(1, POOL_BATCH_CELLS // cell_count)
+
+    for _ in range(POOL_MAX_ATTEMPTS):
+        pending = np.flatnonzero(~pool.any(axis=(1, 2)))
+        if pending.size == 0:
+            return pool
+
+        for begin in range(0, pending.size, batch):
+            chunk = pending[begin:begin + batch]
+            keys = np.stack([rngs[index].random(cell_count) for index in chunk])
+            # The smallest keys pick distinct cells; their order decides which item goes where.
+            chosen = np.argpartition(keys, values.size - 1, axis=1)[:, :values.size]
+            order = np.take_along_axis(keys, chosen, axis=1).argsort(axis=1)
+            chosen = np.take_along_axis(chosen, order, axis=1)
+
+            codes = np.zeros((chunk.size, cell_count), dtype=np.uint8)
+            np.put_along_axis(codes, chosen, values[np.newaxis], axis=1)
+            codes = codes.reshape(chunk.size, size, size)
+
+            solvable = pool_solvable(codes)
+            pool[chunk[solvable]] = codes[solvable]
+
+    raise RuntimeError(f"Failed to generate a valid map after {POOL_MAX_ATTEMPTS} attempts")
+
+
+def pool_solvable(codes: np.ndarray) -> np.ndarray:
+    """Return, per map, whether any treasure is reachable from the agent.
+
+    Grows every agent's reachable region by one step per iteration with
+    array shifts until it stops changing or touches a treasure.
+    """
+    passable = (codes != 2) & (codes != 3)
+    treasures = codes == 1
+    reach = codes == 4
+    found = (reach & treasures).any(axis=(1, 2))
+    # Maps still growing; finished ones are dropped so later steps touch less memory.
+    active = np.flatnonzero(~found)
+    passable, treasures, reach = passable[active], treasures[active], reach[active]
+
+    while active.size:
+        grown = reach.copy()
+        grown[:, 1:] |= reach[:, :-1]
+        grown[:, :-1] |= reach[:, 1:]
+        grown[:, :, 1:] |= reach[:, :, :-1]
+        grown[:, :, :-1] |= reach[:, :, 1:]
+        grown &= passable
+
+        hit = (grown & treasures).any(axis=(1, 2))
+        found[active[hit]] = True
+        growing = ~hit & (grown != reach).any(axis=(1, 2))
+        if not growing.all():
+            active = active[growing]
+            passable, treasures, grown = passable[growing], treasures[growing], grown[growing]
+        reach = grown
+
+    return found
+
+
+def pool_seeds(seeds: Iterable[int]) -> List[int]:
+    """Return the distinct seeds of a pool in row order (ascending)."""
+    return sorted({int(seed) for seed in seeds})
+
+
+def load_pool(
+    size: int,
+    seeds: Iterable[int],
+    wall_density: float = POOL_WALL_DENSITY,
+    num_traps: int = POOL_TRAPS,
+    num_treasures: int = POOL_TREASURES,
+    cache_dir: str = POOL_CACHE_DIR,
+) -> np.memmap:
+    """Return the map pool for a set of seeds, generating and caching it on first use.
+
+    Only the given seeds are generated; row i holds the map of pool_seeds(seeds)[i].
+    """
+    seeds = pool_seeds(seeds)
+    if not seeds:
+        raise ValueError("A pool needs at least one seed")
+    if seeds[-1] - seeds[0] + 1 == len(seeds):
+        key = f"{seeds[0]}-{seeds[-1] + 1}"
+    else:
+        key = hashlib.sha1(np.asarray(seeds, dtype="<i8").tobytes()).hexdigest()[:16]
+    name = f"pool_{size}_{wall_density:g}_{num_traps}_{num_treasures}_{key}.bin"
+    path = os.path.join(cache_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        pool = generate_pool(size, seeds, wall_density, num_traps, num_treasures)
+        # Write under a temporary name so a crashed run never leaves a truncated pool behind.
+        save_scenarios(path + ".tmp", pool)
+        os.replace(path + ".tmp", path)
+    return load_scenarios(path)
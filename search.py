@@ -1,24 +1,41 @@
 from __future__ import annotations
+import csv
 import heapq
+from array import array
 from collections import deque
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
 import time
 
+import numpy as np
+
 Coord = Tuple[int, int]
 
 GoalArray = List[Coord]
 
+# Cell values the agent cannot move through (trap, wall).
+BLOCKED_VALUES = (2, 3)
+
+# Move offsets in successor order: up, right, down, left.
+DIRECTIONS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+# Largest number of treasures whose visiting order tour() solves exactly.
+TOUR_EXACT_LIMIT = 12
+
 @dataclass
 class SearchResult:
     path: List[Coord]
     nodes_expanded: int
     runtime: float
+    # (row, col) of every expanded cell in expansion order; only set when the
+    # search was called with trace=True.
+    explored: np.ndarray | None = None
 
 
 def get_successor_functions(pos: Coord, grid_size: int) -> Iterable[Coord]:
     row, col = pos
-    for d_row, d_col in [(-1, 0), (0, 1), (1, 0), (0, -1)]:  # up, right, down, left
+    for d_row, d_col in DIRECTIONS:
         next_row, next_col = row + d_row, col + d_col
         if 0 <= next_row < grid_size and 0 <= next_col < grid_size:
             yield next_row, next_col
@@ -36,206 +53,924 @@ def build_path(parent: Dict[Coord, Coord], start: Coord, goal: Coord) -> List[Co
     path.reverse()
     return path
 
-def bfs(grid, start: Coord, goal: Coord) -> SearchResult:
-    size = len(grid)
-    blocked = {2, 3}
 
-    explored = []
+@lru_cache(maxsize=8)
+def _neighbor_table(size: int) -> np.ndarray:
+    """Return an (N*N, 4) table of flat neighbour indices in DIRECTIONS order.
+
+    Off-grid neighbours point at the sentinel index N*N, so lookups into arrays
+    padded with one extra element need no bounds checks.
+    """
+    rows, cols = np.divmod(np.arange(size * size, dtype=np.int32), size)
+    table = np.empty((size * size, 4), dtype=np.int32)
+    for direction, (d_row, d_col) in enumerate(DIRECTIONS):
+        next_rows = rows + d_row
+        next_cols = cols + d_col
+        inside = (next_rows >= 0) & (next_rows < size) & (next_cols >= 0) & (next_cols < size)
+        table[:, direction] = np.where(inside, next_rows * size + next_cols, size * size)
+    table.setflags(write=False)
+    return table
+
+
+@lru_cache(maxsize=8)
+def _neighbor_view(size: int) -> memoryview:
+    """Return _neighbor_table(size) as a flat memoryview: cell i's neighbours are [4i, 4i + 4).
+
+    Indexing a memoryview yields plain ints, so the scalar searches can walk
+    the shared table without numpy scalar overhead.
+    """
+    return memoryview(_neighbor_table(size).reshape(-1))
+
+
+def _cell_array(grid) -> np.ndarray:
+    """Return the cell codes of a Grid or of a bare array-like grid."""
+    if hasattr(grid, "get_grid"):
+        return grid.get_grid()
+    return np.asarray(grid)
+
+
+def build_blocked_flags(cells) -> bytearray:
+    """Return flat blocked-cell bytes (1 for traps and walls) plus a trailing 1 for the off-grid sentinel."""
+    cells = np.asarray(cells)
+    flags = bytearray(cells.size + 1)
+    flags[:cells.size] = ((cells == BLOCKED_VALUES[0]) | (cells == BLOCKED_VALUES[1])).astype(np.uint8).tobytes()
+    flags[cells.size] = 1
+    return flags
+
+
+class _ChangeCursor:
+    """A planner's position in a Grid's log of cells whose blocked state flipped."""
+
+    __slots__ = ("revision",)
+
+    def __init__(self, grid):
+        # Grid change number the planner has caught up to (Grid inputs only).
+        self.revision = getattr(grid, "blocked_revision", 0)
+
+    def flips(self, grid, is_blocked) -> List[Tuple[Coord, bool]] | None:
+        """Return (cell, blocked) for logged cells whose state differs from is_blocked(cell).
+
+        Advances the cursor to the grid's current revision. Returns None for a
+        bare cell array or a Grid whose layout was rebuilt since the last
+        call; the caller then has to diff its copy against the current cells.
+        """
+        if not hasattr(grid, "blocked_changes"):
+            return None
+        changes = grid.blocked_changes(self.revision)
+        self.revision = grid.blocked_revision
+        if changes is None:
+            return None
+        flips = []
+        for cell in dict.fromkeys(changes):
+            state = grid.is_blocked(cell)
+            if is_blocked(cell) != state:
+                flips.append((cell, state))
+        return flips
+
+
+def _stop_distances(stops: np.ndarray, jumps: np.ndarray) -> np.ndarray:
+    """Steps from every cell to the first stop cell to its right.
+
+    The distance is positive when that stop is a jump point and negative when
+    it is a blocked cell or the grid edge.
+    """
+    size = stops.shape[1]
+    cols = np.arange(size)
+    first = np.where(stops, cols, size)
+    first = np.minimum.accumulate(first[:, ::-1], axis=1)[:, ::-1]
+    following = np.full(stops.shape, size)
+    following[:, :-1] = first[:, 1:]
+    distances = following - cols
+    is_jump = np.take_along_axis(np.pad(jumps, ((0, 0), (0, 1))), following, axis=1)
+    return np.where(is_jump, distances, -distances)
+
+
+def build_jump_tables(blocked: bytearray, size: int) -> np.ndarray:
+    """Precompute jps scan results as a (4, N*N) table in DIRECTIONS order.
+
+    Entry ``[d, i]`` is how many steps a scan from cell i in direction d runs
+    before it stops: positive when it stops on a jump point, negative when
+    that step hits a wall, trap or the grid edge. Horizontal jump points have
+    a forced vertical neighbour; vertical ones are cells from which a
+    horizontal scan reaches a jump point. The goal is handled by the search.
+    """
+    walls = np.frombuffer(blocked, dtype=np.uint8)[:size * size].reshape(size, size).astype(bool)
+    padded = np.pad(walls, 1, constant_values=True)
+    free = ~padded
+
+    # Forced when moving right: an open cell above or below whose left neighbour is blocked.
+    forced_right = (free[:-2, 1:-1] & padded[:-2, :-2]) | (free[2:, 1:-1] & padded[2:, :-2])
+    forced_left = (free[:-2, 1:-1] & padded[:-2, 2:]) | (free[2:, 1:-1] & padded[2:, 2:])
+    jump_right = forced_right & ~walls
+    jump_left = forced_left & ~walls
+
+    right = _stop_distances(walls | jump_right, jump_right)
+    left = _stop_distances((walls | jump_left)[:, ::-1], jump_left[:, ::-1])[:, ::-1]
+
+    jump_vertical = ((right > 0) | (left > 0)) & ~walls
+    down = _stop_distances((walls | jump_vertical).T, jump_vertical.T).T
+    up = _stop_distances((walls | jump_vertical)[::-1].T, jump_vertical[::-1].T).T[::-1]
+
+    dtype = np.int16 if size < np.iinfo(np.int16).max else np.int32
+    tables = np.stack([table.reshape(-1) for table in (up, right, down, left)]).astype(dtype)
+    tables.setflags(write=False)
+    return tables
+
+
+def count_dtype(count: int) -> type:
+    """Return the narrowest signed integer type that holds counts up to count."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if count <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class _Scratch:
+    """Search arrays for one call, sized to its grid.
+
+    A cell's ``parent`` and ``cost`` entries belong to the running search only
+    while ``stamp[cell]`` is that search's generation (or its negation once
+    the cell is closed), so calls that run several searches (greedy's legs)
+    start each one in O(1) instead of clearing N*N entries. Each call owns its
+    scratch, so concurrent searches never share state and the arrays are freed
+    when the call returns.
+    """
+
+    __slots__ = ("stamp", "parent", "cost", "generation")
+
+    def __init__(self, cell_count: int):
+        self.stamp = array("i", [0]) * cell_count
+        self.parent = array("i", [-1]) * cell_count
+        # Path costs are sums of step costs, so they get 64-bit entries.
+        self.cost = array("q", [0]) * cell_count
+        self.generation = 0
+
+    def begin(self) -> int:
+        """Start a new search and return its generation."""
+        self.generation += 1
+        return self.generation
+
+
+class _BucketQueue:
+    """Monotone integer priority queue (Dial's algorithm).
+
+    Every pushed priority must lie in ``[current, current + span)``, where
+    ``current`` is the last popped priority (``start`` before the first pop).
+    That makes ``span`` circular buckets enough, and push/pop are O(1) apart
+    from skipping empty buckets. Items within a bucket come out last-in
+    first-out.
+    """
+
+    __slots__ = ("buckets", "span", "current", "count")
+
+    def __init__(self, span: int, start: int = 0):
+        self.buckets: List[List[int]] = [[] for _ in range(span)]
+        self.span = span
+        self.current = start
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def push(self, priority: int, item: int) -> None:
+        self.buckets[priority % self.span].append(item)
+        self.count += 1
+
+    def pop(self) -> Tuple[int, int]:
+        bucket = self.buckets[self.current % self.span]
+        while not bucket:
+            self.current += 1
+            bucket = self.buckets[self.current % self.span]
+        self.count -= 1
+        return self.current, bucket.pop()
+
+
+class _GridGraph:
+    """Flat-index view of a grid shared by all search functions.
+
+    Cells are numbered ``row * size + col``. ``blocked`` holds 1 for traps and
+    walls plus a trailing 1 for the off-grid sentinel of ``neighbors``, a flat
+    view of the shared neighbour table, so neighbour lookups need no bounds
+    checks. A Grid supplies its cached blocked bytes; a bare cell array is
+    scanned once per call.
+    """
 
+    __slots__ = ("size", "cell_count", "blocked", "neighbors")
+
+    def __init__(self, grid):
+        if hasattr(grid, "blocked_flags"):
+            self.size = grid.grid_size
+            self.blocked = grid.blocked_flags()
+        else:
+            cells = _cell_array(grid)
+            self.size = len(cells)
+            self.blocked = build_blocked_flags(cells)
+        self.cell_count = self.size * self.size
+        self.neighbors = _neighbor_view(self.size)
+
+    def index(self, cell: Coord) -> int:
+        """Return the flat index of a cell, or -1 when it lies off the grid."""
+        row, col = int(cell[0]), int(cell[1])
+        if 0 <= row < self.size and 0 <= col < self.size:
+            return row * self.size + col
+        return -1
+
+    def path(self, parent: Sequence[int], source: int, target: int) -> List[Coord]:
+        """Rebuild the coordinate path from source to a reached target."""
+        path = []
+        current = target
+        while current != source:
+            path.append(divmod(current, self.size))
+            current = parent[current]
+        path.append(divmod(source, self.size))
+        path.reverse()
+        return path
+
+    def step_costs(self, costs) -> Tuple[List[int] | None, int, int]:
+        """Validate a per-cell cost layer; return (flat costs or None, min, max)."""
+        if costs is None:
+            return None, 1, 1
+
+        layer = np.asarray(costs)
+        if layer.shape != (self.size, self.size):
+            raise ValueError(f"Cost layer shape {layer.shape} does not match grid size {self.size}")
+        if not np.issubdtype(layer.dtype, np.integer):
+            raise ValueError("Cost layer must contain integers")
+
+        open_costs = layer.ravel()[np.frombuffer(self.blocked, dtype=np.uint8)[:self.cell_count] == 0]
+        if open_costs.size and open_costs.min() < 1:
+            raise ValueError("Cell costs must be at least 1")
+
+        if not open_costs.size:
+            return layer.ravel().tolist(), 1, 1
+        return layer.ravel().tolist(), int(open_costs.min()), int(open_costs.max())
+
+    def trace_buffer(self, enabled: bool) -> np.ndarray | None:
+        """Preallocate an expansion-order buffer when tracing is enabled."""
+        if not enabled:
+            return None
+        return np.empty(self.cell_count, dtype=np.int32)
+
+    def explored(self, buffer: np.ndarray | None, count: int) -> np.ndarray | None:
+        """Convert the first ``count`` traced flat indices to (row, col) pairs."""
+        if buffer is None:
+            return None
+        rows, cols = np.divmod(buffer[:count], self.size)
+        return np.stack((rows, cols), axis=1)
+
+
+@dataclass
+class DistanceField:
+    """Breadth-first distances from one source cell to every cell of a grid.
+
+    ``distances`` holds the step count (-1 when unreachable), ``first_step`` the
+    index into DIRECTIONS of the first move on a shortest path from the source
+    (-1 for the source and unreachable cells) and ``parent`` the flat index of
+    each cell's predecessor in the BFS tree.
+    """
+
+    source: Coord
+    distances: np.ndarray
+    first_step: np.ndarray
+    parent: np.ndarray
+    nodes_expanded: int
+    runtime: float
+
+    def distance(self, cell: Coord) -> int:
+        """Return the shortest path length to cell, or -1 if it is unreachable."""
+        return int(self.distances[cell])
+
+    def reachable(self, cell: Coord) -> bool:
+        """Return True when cell can be reached from the source."""
+        return bool(self.distances[cell] >= 0)
+
+    def next_cell(self, cell: Coord) -> Coord | None:
+        """Return the cell to move to from the source to head toward cell."""
+        direction = int(self.first_step[cell])
+        if direction < 0:
+            return None
+        d_row, d_col = DIRECTIONS[direction]
+        return self.source[0] + d_row, self.source[1] + d_col
+
+    def path_to(self, cell: Coord) -> List[Coord]:
+        """Return a shortest path from the source to cell, or [] if unreachable."""
+        if self.distances[cell] < 0:
+            return []
+
+        size = len(self.distances)
+        parent = self.parent.ravel()
+        current = cell[0] * size + cell[1]
+        path = [cell]
+        while parent[current] >= 0:
+            current = int(parent[current])
+            path.append(divmod(current, size))
+        path.reverse()
+        return path
+
+
+def distance_field(grid, source: Coord) -> DistanceField:
+    """Run one vectorized BFS wavefront from source over the whole grid."""
     t0 = time.perf_counter()
 
-    q = deque([start])
-    visited = {start}
-    parent = {}
+    graph = _GridGraph(grid)
+    size = graph.size
+    cell_count = graph.cell_count
+    origin = graph.index(source)
+    distances, first_step, parent, nodes_expanded = _wavefront(_padded_passable(graph), size, origin)
+
+    t1 = time.perf_counter()
+
+    return DistanceField(
+        source=source,
+        distances=distances[:cell_count].reshape(size, size),
+        first_step=first_step[:cell_count].reshape(size, size),
+        parent=parent[:cell_count].reshape(size, size),
+        nodes_expanded=nodes_expanded,
+        runtime=t1 - t0,
+    )
+
+
+def _padded_passable(graph: _GridGraph) -> np.ndarray:
+    """Return the flat passable mask with one False slot for the off-grid sentinel."""
+    return np.frombuffer(graph.blocked, dtype=np.uint8) == 0
+
+
+def _wavefront(
+    passable: np.ndarray, size: int, origin: int, targets: np.ndarray | None = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Level-synchronous BFS over flat indices; returns padded distance, first-step and parent arrays.
+
+    With ``targets`` (flat indices) the wavefront stops after the level that
+    reaches the last passable one of them.
+    """
+    cell_count = size * size
+    table = _neighbor_table(size)
+    directions = np.arange(4, dtype=np.int8)
+
+    unvisited = passable.copy()
+    distances = np.full(cell_count + 1, -1, dtype=np.int32)
+    first_step = np.full(cell_count + 1, -1, dtype=np.int8)
+    parent = np.full(cell_count + 1, -1, dtype=np.int32)
+
+    distances[origin] = 0
+    unvisited[origin] = False
+    frontier = np.array([origin], dtype=np.int32)
+    nodes_expanded = 0
+    depth = 0
+    pending = None
+    if targets is not None:
+        pending = targets[unvisited[targets]]
+
+    while frontier.size:
+        if pending is not None:
+            pending = pending[distances[pending] < 0]
+            if pending.size == 0:
+                break
+        nodes_expanded += int(frontier.size)
+        depth += 1
+
+        candidates = table[frontier]
+        fresh = unvisited[candidates]
+        nodes = candidates[fresh]
+        parents = np.broadcast_to(frontier[:, None], candidates.shape)[fresh]
+
+        # A cell reached from several frontier cells keeps the last parent written.
+        parent[nodes] = parents
+        keep = parent[nodes] == parents
+        nodes = nodes[keep]
+        parents = parents[keep]
+
+        unvisited[nodes] = False
+        distances[nodes] = depth
+        if depth == 1:
+            first_step[nodes] = np.broadcast_to(directions, candidates.shape)[fresh][keep]
+        else:
+            first_step[nodes] = first_step[parents]
+        frontier = nodes
+
+    return distances, first_step, parent, nodes_expanded
+
+
+@dataclass
+class BatchResult:
+    """Answers to many start/goal queries on one grid, in array form.
+
+    ``lengths[i]`` is the path length of query i (-1 when unreachable). The
+    cells of path i are ``path_cells[path_offsets[i]:path_offsets[i + 1]]``
+    as (row, col) rows; unreachable queries have an empty slice.
+    """
+
+    lengths: np.ndarray
+    path_offsets: np.ndarray
+    path_cells: np.ndarray
+    nodes_expanded: int
+    runtime: float
+
+    def path(self, query: int) -> List[Coord]:
+        """Return the path of one query as a list of coordinates."""
+        cells = self.path_cells[self.path_offsets[query]:self.path_offsets[query + 1]]
+        return [(int(row), int(col)) for row, col in cells]
+
+
+def batch_paths(grid, starts, goals) -> BatchResult:
+    """Answer many shortest-path queries with one BFS wavefront per distinct start.
+
+    ``starts`` and ``goals`` are (Q, 2) arrays of (row, col). Queries are
+    grouped by start; each start's wavefront runs until all of its goals are
+    reached, and those paths are read from its BFS tree before the next
+    start. Queries with an off-grid start or goal get length -1. This pays
+    off when many goals share a start on walled maps; on open maps a_star
+    per query is about as fast.
+    """
+    t0 = time.perf_counter()
+
+    graph = _GridGraph(grid)
+    size = graph.size
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+    goals = np.asarray(goals, dtype=np.int64).reshape(-1, 2)
+    if len(starts) != len(goals):
+        raise ValueError("starts and goals must contain the same number of queries")
+
+    passable = _padded_passable(graph)
+    on_grid = ((starts >= 0) & (starts < size) & (goals >= 0) & (goals < size)).all(axis=1)
+    start_index = starts[:, 0] * size + starts[:, 1]
+    goal_index = goals[:, 0] * size + goals[:, 1]
+
+    queries = np.flatnonzero(on_grid)
+    sources, group, group_sizes = np.unique(start_index[queries], return_inverse=True, return_counts=True)
+    by_group = np.split(queries[np.argsort(group, kind="stable")], np.cumsum(group_sizes)[:-1])
+
+    lengths = np.full(len(starts), -1, dtype=np.int32)
+    pieces = []
     nodes_expanded = 0
+    for source, members in zip(sources.tolist(), by_group):
+        targets = goal_index[members]
+        distances, _, parent, expanded = _wavefront(passable, size, source, targets)
+        nodes_expanded += expanded
+        lengths[members] = distances[targets]
+
+        # Walk every reached goal of the group back to the start at once, filling paths from the end.
+        reached = members[lengths[members] >= 0]
+        offsets = np.zeros(len(reached) + 1, dtype=np.int64)
+        np.cumsum(lengths[reached] + 1, out=offsets[1:])
+        cells = np.empty(int(offsets[-1]), dtype=np.int64)
+        active = np.arange(len(reached))
+        current = goal_index[reached]
+        position = offsets[1:] - 1
+        while active.size:
+            cells[position] = current
+            more = position > offsets[active]
+            active = active[more]
+            current = parent[current[more]]
+            position = position[more] - 1
+        pieces.append((reached, offsets, cells))
+
+    path_sizes = np.where(lengths >= 0, lengths + 1, 0)
+    path_offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+    np.cumsum(path_sizes, out=path_offsets[1:])
+    path_flat = np.empty(int(path_offsets[-1]), dtype=np.int64)
+    for reached, offsets, cells in pieces:
+        shift = np.repeat(path_offsets[reached] - offsets[:-1], np.diff(offsets))
+        path_flat[np.arange(cells.size) + shift] = cells
+
+    rows, cols = np.divmod(path_flat, size)
+    t1 = time.perf_counter()
+
+    return BatchResult(
+        lengths=lengths,
+        path_offsets=path_offsets,
+        path_cells=np.stack((rows, cols), axis=1).astype(np.int32),
+        nodes_expanded=nodes_expanded,
+        runtime=t1 - t0,
+    )
+
+
+def bfs(grid, start: Coord, goal: Coord, trace: bool = False) -> SearchResult:
+    t0 = time.perf_counter()
+
+    graph = _GridGraph(grid)
+    neighbors = graph.neighbors
+    blocked = graph.blocked
+    source = graph.index(start)
+    target = graph.index(goal)
+    trace_buffer = graph.trace_buffer(trace)
+
+    scratch = _Scratch(graph.cell_count)
+    stamp, parent = scratch.stamp, scratch.parent
+    generation = scratch.begin()
+    stamp[source] = generation
+    q = deque([source])
+    nodes_expanded = 0
+    found = False
 
     while q:
         current = q.popleft()
+        if trace_buffer is not None:
+            trace_buffer[nodes_expanded] = current
         nodes_expanded += 1
-        explored.append(current)
-        
-        if current == goal:
+
+        if current == target:
+            found = True
             break
 
-        for nb in get_successor_functions(current, size):
-            row, col = nb
-            if grid[row][col] in blocked:
+        base = 4 * current
+        for nb in neighbors[base:base + 4]:
+            if blocked[nb] or stamp[nb] == generation:
                 continue
-            if nb in visited:
-                continue
-            visited.add(nb)
+            stamp[nb] = generation
             parent[nb] = current
             q.append(nb)
 
-    path = build_path(parent, start, goal)
+    path = graph.path(parent, source, target) if found else []
     t1 = time.perf_counter()
 
-    print(f"BFS Explored: {explored}")
-
-    return SearchResult(path=path, nodes_expanded=nodes_expanded, runtime=t1 - t0)
-
-def dfs(grid, start: Coord, goal: Coord) -> SearchResult:
-    size = len(grid)
-    blocked = {2, 3}
-
-    explored = []
+    return SearchResult(
+        path=path,
+        nodes_expanded=nodes_expanded,
+        runtime=t1 - t0,
+        explored=graph.explored(trace_buffer, nodes_expanded),
+    )
 
+def dfs(grid, start: Coord, goal: Coord, trace: bool = False) -> SearchResult:
     t0 = time.perf_counter()
 
-    stack = [start]
-    visited = {start}
-    parent = {}
+    graph = _GridGraph(grid)
+    neighbors = graph.neighbors
+    blocked = graph.blocked
+    source = graph.index(start)
+    target = graph.index(goal)
+    trace_buffer = graph.trace_buffer(trace)
+
+    scratch = _Scratch(graph.cell_count)
+    stamp, parent = scratch.stamp, scratch.parent
+    generation = scratch.begin()
+    stamp[source] = generation
+    stack = [source]
     nodes_expanded = 0
+    found = False
 
     while stack:
         current = stack.pop()
+        if trace_buffer is not None:
+            trace_buffer[nodes_expanded] = current
         nodes_expanded += 1
-        explored.append(current)
 
-        if current == goal:
+        if current == target:
+            found = True
             break
 
-        for nb in reversed(list(get_successor_functions(current, size))):
-            row, col = nb
-            if grid[row][col] in blocked:
+        base = 4 * current
+        for nb in reversed(neighbors[base:base + 4]):
+            if blocked[nb] or stamp[nb] == generation:
                 continue
-            if nb in visited:
-                continue
-            visited.add(nb)
+            stamp[nb] = generation
             parent[nb] = current
             stack.append(nb)
 
-    path = build_path(parent, start, goal)
+    path = graph.path(parent, source, target) if found else []
     t1 = time.perf_counter()
 
-    print(f"DFS Explored: {explored}")
+    return SearchResult(
+        path=path,
+        nodes_expanded=nodes_expanded,
+        runtime=t1 - t0,
+        explored=graph.explored(trace_buffer, nodes_expanded),
+    )
+
+def ucs(grid, start: Coord, goal: Coord, trace: bool = False, costs=None) -> SearchResult:
+    """Uniform-cost search with an optional per-cell integer cost layer.
+
+    ``costs[row, col]`` is the cost of stepping into that cell (default 1).
+    Priorities are small integers, so the frontier is a bucket queue (Dial's
+    algorithm) with O(1) push and pop instead of a binary heap.
+    """
+    t0 = time.perf_counter()
+
+    graph = _GridGraph(grid)
+    neighbors = graph.neighbors
+    blocked = graph.blocked
+    source = graph.index(start)
+    target = graph.index(goal)
+    trace_buffer = graph.trace_buffer(trace)
+    step_costs, _, max_cost = graph.step_costs(costs)
+
+    scratch = _Scratch(graph.cell_count)
+    stamp, parent, cost_so_far = scratch.stamp, scratch.parent, scratch.cost
+    generation = scratch.begin()
+    closed = -generation
+    queue = _BucketQueue(max_cost + 1)
+    queue.push(0, source)
+    stamp[source] = generation
+    cost_so_far[source] = 0
+    nodes_expanded = 0
+    found = False
+
+    while queue:
+        cost, current = queue.pop()
+
+        if stamp[current] == closed:
+            continue
+        stamp[current] = closed
+        if trace_buffer is not None:
+            trace_buffer[nodes_expanded] = current
+        nodes_expanded += 1
+
+        if current == target:
+            found = True
+            break
+
+        base = 4 * current
+        for nb in neighbors[base:base + 4]:
+            if blocked[nb]:
+                continue
+            mark = stamp[nb]
+            if mark == closed:
+                continue
+            new_cost = cost + (step_costs[nb] if step_costs is not None else 1)
+            if mark == generation and cost_so_far[nb] <= new_cost:
+                continue
+            stamp[nb] = generation
+            cost_so_far[nb] = new_cost
+            parent[nb] = current
+            queue.push(new_cost, nb)
 
-    return SearchResult(path=path, nodes_expanded=nodes_expanded, runtime=t1 - t0)
+    path = graph.path(parent, source, target) if found else []
+    t1 = time.perf_counter()
 
-def ucs(grid, start: Coord, goal: Coord) -> SearchResult:
-    size = len(grid)
-    blocked = {2, 3}
+    return SearchResult(
+        path=path,
+        nodes_expanded=nodes_expanded,
+        runtime=t1 - t0,
+        explored=graph.explored(trace_buffer, nodes_expanded),
+    )
 
-    explored = []
+def a_star(grid, start: Coord, goal: Coord, trace: bool = False, costs=None) -> SearchResult:
+    """A* with Manhattan distance and an optional per-cell integer cost layer.
 
+    With a cost layer the heuristic is scaled by the cheapest cell cost so it
+    stays admissible and consistent. f-values then grow by at most
+    ``max_cost + min_cost`` per expansion, which bounds the bucket queue.
+    """
     t0 = time.perf_counter()
 
-    # Min-heap: (cost, row, col)
-    start_row, start_col = start
-    heap = [(0, start_row, start_col)]
-    visited = set()
-    parent = {}
+    graph = _GridGraph(grid)
+    neighbors = graph.neighbors
+    blocked = graph.blocked
+    size = graph.size
+    source = graph.index(start)
+    target = graph.index(goal)
+    trace_buffer = graph.trace_buffer(trace)
+    goal_row, goal_col = goal
+    step_costs, min_cost, max_cost = graph.step_costs(costs)
+
+    scratch = _Scratch(size * size)
+    stamp, parent, g_score = scratch.stamp, scratch.parent, scratch.cost
+    generation = scratch.begin()
+    closed = -generation
+    start_f = min_cost * _manhattan_distance(start, goal)
+    queue = _BucketQueue(max_cost + min_cost + 1, start_f)
+    queue.push(start_f, source)
+    stamp[source] = generation
+    g_score[source] = 0
     nodes_expanded = 0
+    found = False
 
-    while heap:
-        cost, row, col = heapq.heappop(heap)
-        current = (row, col)
+    while queue:
+        _, current = queue.pop()
 
-        if current in visited:
+        if stamp[current] == closed:
             continue
-        visited.add(current)
+        stamp[current] = closed
+        if trace_buffer is not None:
+            trace_buffer[nodes_expanded] = current
         nodes_expanded += 1
-        explored.append(current)
 
-        if current == goal:
+        if current == target:
+            found = True
             break
 
-        for nb in get_successor_functions(current, size):
-            nrow, ncol = nb
-            if grid[nrow][ncol] in blocked:
+        g = g_score[current]
+        base = 4 * current
+        for nb in neighbors[base:base + 4]:
+            if blocked[nb]:
+                continue
+            mark = stamp[nb]
+            if mark == closed:
                 continue
-            if nb in visited:
+            new_g = g + (step_costs[nb] if step_costs is not None else 1)
+            if mark == generation and g_score[nb] <= new_g:
                 continue
-            new_cost = cost + 1
-            heapq.heappush(heap, (new_cost, nrow, ncol))
+            stamp[nb] = generation
+            g_score[nb] = new_g
             parent[nb] = current
+            nrow, ncol = divmod(nb, size)
+            new_h = min_cost * (abs(nrow - goal_row) + abs(ncol - goal_col))
+            queue.push(new_g + new_h, nb)
 
-    path = build_path(parent, start, goal)
+    path = graph.path(parent, source, target) if found else []
     t1 = time.perf_counter()
 
-    print(f"UCS Explored: {explored}")
+    return SearchResult(
+        path=path,
+        nodes_expanded=nodes_expanded,
+        runtime=t1 - t0,
+        explored=graph.explored(trace_buffer, nodes_expanded),
+    )
 
-    return SearchResult(path=path, nodes_expanded=nodes_expanded, runtime=t1 - t0)
+def jps(grid, start: Coord, goal: Coord, trace: bool = False) -> SearchResult:
+    """Jump Point Search for uniform-cost 4-connected grids.
 
-def a_star(grid, start: Coord, goal: Coord) -> SearchResult:
-    size = len(grid)
-    blocked = {2, 3}
+    Paths are pruned to a canonical form that moves vertically before
+    horizontally. Horizontal scans stop at cells with a forced vertical
+    neighbour; vertical scans stop where a horizontal scan finds a jump point.
+    Only jump points are pushed on the open list and counted as expanded.
+    Every scan is one lookup in the jump tables (cached per Grid) plus a
+    check for the goal.
+    """
+    t0 = time.perf_counter()
 
-    explored = []
+    graph = _GridGraph(grid)
+    size = graph.size
+    blocked = graph.blocked
+    source = graph.index(start)
+    target = graph.index(goal)
+    trace_buffer = graph.trace_buffer(trace)
+    goal_row, goal_col = int(goal[0]), int(goal[1])
 
-    t0 = time.perf_counter()
+    if hasattr(grid, "jump_tables"):
+        tables = grid.jump_tables()
+    else:
+        tables = build_jump_tables(blocked, size)
+    up, right, down, left = (memoryview(table) for table in tables)
+
+    def free(row: int, col: int) -> bool:
+        return 0 <= row < size and 0 <= col < size and not blocked[row * size + col]
+
+    def jump_horizontal(row: int, col: int, d_col: int) -> int:
+        steps = (right if d_col > 0 else left)[row * size + col]
+        if row == goal_row and 0 < (goal_col - col) * d_col < abs(steps):
+            return target
+        if steps < 0:
+            return -1
+        return row * size + col + steps * d_col
+
+    def goal_visible(col: int) -> bool:
+        # A horizontal scan from (goal_row, col) would reach the goal before stopping.
+        if col == goal_col:
+            return True
+        table = right if goal_col > col else left
+        return abs(goal_col - col) < abs(table[goal_row * size + col])
+
+    def jump_vertical(row: int, col: int, d_row: int) -> int:
+        steps = (down if d_row > 0 else up)[row * size + col]
+        if 0 < (goal_row - row) * d_row < abs(steps) and goal_visible(col):
+            return goal_row * size + col
+        if steps < 0:
+            return -1
+        return (row + steps * d_row) * size + col
 
-    heap = [(_manhattan_distance(start, goal), 0, start)]
-    visited = set()
+    def successors(row: int, col: int, direction: int) -> List[Tuple[int, int]]:
+        if direction < 0:
+            directions = [0, 1, 2, 3]
+        elif direction in (0, 2):
+            # Arrived vertically: keep going, or turn either way horizontally.
+            directions = [direction, 1, 3]
+        else:
+            # Arrived horizontally: keep going, or turn vertically where forced.
+            d_col = DIRECTIONS[direction][1]
+            directions = [direction]
+            if free(row - 1, col) and not free(row - 1, col - d_col):
+                directions.append(0)
+            if free(row + 1, col) and not free(row + 1, col - d_col):
+                directions.append(2)
+
+        jump_points = []
+        for next_direction in directions:
+            d_row, d_col = DIRECTIONS[next_direction]
+            if d_row:
+                point = jump_vertical(row, col, d_row)
+            else:
+                point = jump_horizontal(row, col, d_col)
+            if point >= 0:
+                jump_points.append((point, next_direction))
+        return jump_points
+
+    # Ties on f go to the deeper node, as in a_star, so straight runs toward the goal are followed first.
+    heap = [(_manhattan_distance(start, goal), 0, source, -1)]
+    scratch = _Scratch(size * size)
+    stamp = scratch.stamp
+    generation = scratch.begin()
+    # Only jump points get a g-score or parent, so sparse dicts beat full arrays here.
+    g_score = {source: 0}
     parent = {}
     nodes_expanded = 0
+    found = False
 
     while heap:
-        f, g, current_coord = heapq.heappop(heap)
-        current = current_coord
+        f, negative_g, current, direction = heapq.heappop(heap)
 
-        if current in visited:
+        if stamp[current] == generation:
             continue
-        visited.add(current)
+        stamp[current] = generation
+        if trace_buffer is not None:
+            trace_buffer[nodes_expanded] = current
         nodes_expanded += 1
-        explored.append((current, f))
 
-        if current == goal:
+        if current == target:
+            found = True
             break
 
-        for nb in get_successor_functions(current, size):
-            nrow, ncol = nb
-            if grid[nrow][ncol] in blocked:
+        g = -negative_g
+        row, col = divmod(current, size)
+        for point, next_direction in successors(row, col, direction):
+            if stamp[point] == generation:
                 continue
-            if nb in visited:
+            point_row, point_col = divmod(point, size)
+            new_g = g + abs(point_row - row) + abs(point_col - col)
+            if point in g_score and g_score[point] <= new_g:
                 continue
-            new_g = g + 1
-            new_h = _manhattan_distance(nb, goal)
-            new_f = new_g + new_h
-            heapq.heappush(heap, (new_f, new_g, (nrow, ncol)))
-            parent[nb] = current
+            g_score[point] = new_g
+            parent[point] = current
+            new_h = abs(point_row - goal_row) + abs(point_col - goal_col)
+            heapq.heappush(heap, (new_g + new_h, -new_g, point, next_direction))
 
-    path = build_path(parent, start, goal)
-    t1 = time.perf_counter()
+    path = []
+    if found:
+        # Jump points are joined by straight segments; expand them cell by cell.
+        jump_path = [target]
+        while jump_path[-1] != source:
+            jump_path.append(parent[jump_path[-1]])
+        jump_path.reverse()
+
+        path.append(divmod(source, size))
+        for point in jump_path[1:]:
+            row, col = path[-1]
+            point_row, point_col = divmod(point, size)
+            d_row = (point_row > row) - (point_row < row)
+            d_col = (point_col > col) - (point_col < col)
+            while (row, col) != (point_row, point_col):
+                row += d_row
+                col += d_col
+                path.append((row, col))
 
-    print(f"A* Explored: {explored}")
+    t1 = time.perf_counter()
 
-    return SearchResult(path=path, nodes_expanded=nodes_expanded, runtime=t1 - t0)
+    return SearchResult(
+        path=path,
+        nodes_expanded=nodes_expanded,
+        runtime=t1 - t0,
+        explored=graph.explored(trace_buffer, nodes_expanded),
+    )
 
-def greedy(grid, start: Coord, goal_array: GoalArray) -> SearchResult:
-    size = len(grid)
-    blocked = {2, 3}
+def greedy(grid, start: Coord, goal_array: GoalArray, trace: bool = False) -> SearchResult:
     t0 = time.perf_counter()
+
+    graph = _GridGraph(grid)
+    neighbors = graph.neighbors
+    blocked = graph.blocked
+    size = graph.size
+    scratch = _Scratch(size * size)
+    stamp, parent = scratch.stamp, scratch.parent
     full_path = []
     current_start = start
     total_nodes_expanded = 0
+    leg_traces = []
 
     for goal in goal_array:
-        heap = [(0, current_start)]
-        visited = {current_start}
-        parent = {}
+        source = graph.index(current_start)
+        target = graph.index(goal)
+        goal_row, goal_col = goal
+
+        heap = [(0, source)]
+        generation = scratch.begin()
+        stamp[source] = generation
+        trace_buffer = graph.trace_buffer(trace)
         nodes_expanded = 0
         path_to_goal = []
 
         while heap:
             _, current = heapq.heappop(heap)
+            if trace_buffer is not None:
+                trace_buffer[nodes_expanded] = current
             nodes_expanded += 1
 
-            if current == goal:
-                path_to_goal = build_path(parent, current_start, goal)
+            if current == target:
+                path_to_goal = graph.path(parent, source, target)
                 break
 
-            for nb in get_successor_functions(current, size):
-                nrow, ncol = nb
-                if grid[nrow][ncol] in blocked:
+            base = 4 * current
+            for nb in neighbors[base:base + 4]:
+                if blocked[nb] or stamp[nb] == generation:
                     continue
-                if nb in visited:
-                    continue
-                visited.add(nb)
-                heuristic_cost = _manhattan_distance(nb, goal)
+                stamp[nb] = generation
+                nrow, ncol = divmod(nb, size)
+                heuristic_cost = abs(nrow - goal_row) + abs(ncol - goal_col)
                 heapq.heappush(heap, (heuristic_cost, nb))
                 parent[nb] = current
 
+        if trace_buffer is not None:
+            leg_traces.append(graph.explored(trace_buffer, nodes_expanded))
+
         if not path_to_goal:
             break
 
@@ -247,7 +982,149 @@ def greedy(grid, start: Coord, goal_array: GoalArray) -> SearchResult:
         current_start = goal
 
     t1 = time.perf_counter()
-    return SearchResult(path=full_path, nodes_expanded=total_nodes_expanded, runtime=t1 - t0)
+
+    explored = None
+    if trace:
+        explored = np.concatenate(leg_traces) if leg_traces else np.empty((0, 2), dtype=np.int32)
+
+    return SearchResult(
+        path=full_path,
+        nodes_expanded=total_nodes_expanded,
+        runtime=t1 - t0,
+        explored=explored,
+    )
+
+def tour(grid, start: Coord, goal_array: GoalArray, trace: bool = False) -> SearchResult:
+    """Visit every reachable treasure along a short combined path.
+
+    One BFS distance field per stop gives all pairwise path lengths. The order
+    is solved exactly with Held-Karp for up to TOUR_EXACT_LIMIT treasures and
+    with nearest neighbour plus 2-opt above that. Legs are read back from the
+    stored BFS trees, so no search runs twice.
+    """
+    t0 = time.perf_counter()
+
+    start_field = distance_field(grid, start)
+    goals = []
+    for goal in goal_array:
+        goal = (int(goal[0]), int(goal[1]))
+        if goal != start and goal not in goals and start_field.reachable(goal):
+            goals.append(goal)
+
+    fields = [start_field] + [distance_field(grid, goal) for goal in goals]
+    stops = [start] + goals
+    distances = np.array(
+        [[field.distance(stop) for stop in stops] for field in fields],
+        dtype=np.int64,
+    )
+
+    if len(goals) <= TOUR_EXACT_LIMIT:
+        order = _held_karp_order(distances)
+    else:
+        order = _two_opt_order(distances, _nearest_neighbor_order(distances))
+
+    full_path = [start]
+    current = 0
+    for stop in order:
+        full_path.extend(fields[current].path_to(stops[stop])[1:])
+        current = stop
+
+    explored = None
+    if trace:
+        # A BFS settles cells in order of distance, so that order is its expansion order.
+        layers = []
+        for field in fields:
+            reached = field.distances >= 0
+            order_by_distance = np.argsort(field.distances[reached], kind="stable")
+            layers.append(np.argwhere(reached)[order_by_distance])
+        explored = np.concatenate(layers)
+
+    t1 = time.perf_counter()
+
+    return SearchResult(
+        path=full_path,
+        nodes_expanded=sum(field.nodes_expanded for field in fields),
+        runtime=t1 - t0,
+        explored=explored,
+    )
+
+def _held_karp_order(distances: np.ndarray) -> List[int]:
+    """Return the stop order (excluding stop 0) of the shortest open tour from stop 0."""
+    count = len(distances) - 1
+    if count == 0:
+        return []
+
+    full = (1 << count) - 1
+    cost = np.full((full + 1, count), np.iinfo(np.int64).max // 4, dtype=np.int64)
+    previous = np.full((full + 1, count), -1, dtype=np.int64)
+    legs = distances[1:, 1:]
+    for stop in range(count):
+        cost[1 << stop, stop] = distances[0, stop + 1]
+
+    stops = np.arange(count)
+    for mask in range(1, full + 1):
+        # candidates[i, j]: finish the set at i, then extend to j.
+        candidates = cost[mask][:, None] + legs
+        best_from = candidates.argmin(axis=0)
+        best = candidates[best_from, stops]
+        extend = ((mask >> stops) & 1) == 0
+        if not extend.any():
+            continue
+        new_masks = mask | (1 << stops[extend])
+        better = best[extend] < cost[new_masks, stops[extend]]
+        cost[new_masks[better], stops[extend][better]] = best[extend][better]
+        previous[new_masks[better], stops[extend][better]] = best_from[extend][better]
+
+    order = []
+    mask = full
+    stop = int(cost[full].argmin())
+    while stop >= 0:
+        order.append(stop + 1)
+        next_stop = int(previous[mask, stop])
+        mask ^= 1 << stop
+        stop = next_stop
+    order.reverse()
+    return order
+
+def _nearest_neighbor_order(distances: np.ndarray) -> List[int]:
+    """Build an open tour from stop 0 by always visiting the closest unvisited stop."""
+    unvisited = set(range(1, len(distances)))
+    order = []
+    current = 0
+    while unvisited:
+        current = min(unvisited, key=lambda stop: (distances[current, stop], stop))
+        unvisited.remove(current)
+        order.append(current)
+    return order
+
+def _two_opt_order(distances: np.ndarray, order: List[int]) -> List[int]:
+    """Reverse segments of an open tour from stop 0 while that shortens it."""
+    route = [0] + order
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(route) - 1):
+            for j in range(i + 1, len(route)):
+                before = distances[route[i - 1], route[i]]
+                after = distances[route[i - 1], route[j]]
+                if j + 1 < len(route):
+                    before += distances[route[j], route[j + 1]]
+                    after += distances[route[i], route[j + 1]]
+                if after < before:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route[1:]
+
+def write_trace(result: SearchResult, filename: str) -> None:
+    """Write a traced search's expansion order to CSV (step, row, col)."""
+    if result.explored is None:
+        raise ValueError("Search result has no trace; run the search with trace=True")
+
+    with open(filename, "w", newline="", encoding="utf-8") as trace_file:
+        writer = csv.writer(trace_file)
+        writer.writerow(["step", "row", "col"])
+        for step, (row, col) in enumerate(result.explored.tolist()):
+            writer.writerow([step, row, col])
 
 def _manhattan_distance(current: Coord, goal: Coord) -> int:
-    return abs(current[0] - goal[0]) + abs(current[1] - goal[1])
\ No newline at end of file
+    return abs(current[0] - goal[0]) + abs(current[1] - goal[1])